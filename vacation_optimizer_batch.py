@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Execução em Lote do Otimizador de Férias
+----------------------------------------
+Distribui jobs (servidor, ano, jurisdição) entre processos de um
+ProcessPoolExecutor. Os calendários de feriados são construídos uma única vez
+no processo principal e enviados a cada worker na inicialização ou, com um
+arquivo gerado por vacation_optimizer_store, lidos por cada worker via mmap.
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Tuple, Optional, Iterable
+
+from vacation_optimizer_test import (
+    DEFAULT_JURISDICTION, MAX_FRACTIONS, CalendarCache, HolidayCalendar,
+    VacationOptimizer, _calendar_cache
+)
+from vacation_optimizer_store import CalendarStore
+
+# Quantidade de jobs enviada a um worker de cada vez
+BATCH_CHUNK_SIZE = 64
+
+
+class OptimizationJob:
+    __slots__ = ("employee", "year", "jurisdiction", "budget", "max_fractions", "top_k")
+
+    def __init__(self, employee: str, year: int, jurisdiction: str = DEFAULT_JURISDICTION,
+                 budget: int = 30, max_fractions: int = MAX_FRACTIONS, top_k: int = 3):
+        self.employee = employee
+        self.year = year
+        self.jurisdiction = jurisdiction
+        self.budget = budget
+        self.max_fractions = max_fractions
+        self.top_k = top_k
+
+    def calendar_keys(self) -> List[Tuple[int, str]]:
+        """O recesso de dezembro vem no calendário do ano seguinte, então ambos são necessários"""
+        return [(self.year, self.jurisdiction), (self.year + 1, self.jurisdiction)]
+
+
+class OptimizationResult:
+    __slots__ = ("employee", "year", "jurisdiction", "plans")
+
+    def __init__(self, employee: str, year: int, jurisdiction: str, plans: List[Dict[str, Any]]):
+        self.employee = employee
+        self.year = year
+        self.jurisdiction = jurisdiction
+        # Planos já serializados: frações (início, fim) em ISO, dias de folga e eficiência
+        self.plans = plans
+
+    def __str__(self):
+        best = self.plans[0] if self.plans else None
+        summary = f"{best['days_off']} dias de folga" if best else "sem plano"
+        return f"{self.employee} {self.year} ({self.jurisdiction}): {summary}"
+
+
+# Estado de cada processo worker, preenchido por _init_worker
+_worker_cache: Optional[CalendarCache] = None
+_worker_optimizers: Dict[str, VacationOptimizer] = {}
+_worker_store: Optional[CalendarStore] = None
+
+
+def _init_worker(calendars: List[HolidayCalendar]):
+    """Recebe os calendários pré-computados uma vez por processo"""
+    global _worker_cache
+    _worker_cache = CalendarCache(maxsize=max(len(calendars), 1))
+    for calendar in calendars:
+        _worker_cache.put(calendar)
+    _worker_optimizers.clear()
+
+
+def _init_worker_from_store(path: str):
+    """Abre o arquivo de calendários no worker; só o caminho atravessa o processo"""
+    global _worker_cache, _worker_store
+    _worker_store = CalendarStore(path)
+    _worker_cache = CalendarCache(builder=_worker_store.calendar_or_build)
+    _worker_optimizers.clear()
+
+
+def _optimizer_for(jurisdiction: str, cache: CalendarCache,
+                   store: Optional[CalendarStore] = None) -> VacationOptimizer:
+    optimizer = _worker_optimizers.get(jurisdiction)
+    if optimizer is None:
+        optimizer = VacationOptimizer(cache)
+        if store is not None:
+            # Feriados e YearCalendar da jurisdição vêm do arquivo mapeado, sem recálculo
+            store.load_into(optimizer, jurisdiction)
+        _worker_optimizers[jurisdiction] = optimizer
+    return optimizer
+
+
+def run_job(job: OptimizationJob, cache: Optional[CalendarCache] = None,
+            store: Optional[CalendarStore] = None) -> OptimizationResult:
+    """Executa um job num otimizador reaproveitado por jurisdição (planos ficam memorizados)"""
+    if cache is None:
+        cache = _worker_cache if _worker_cache is not None else _calendar_cache
+        if store is None:
+            store = _worker_store
+    optimizer = _optimizer_for(job.jurisdiction, cache, store)
+    for year, jurisdiction in job.calendar_keys():
+        optimizer.load_calendar(cache.get(year, jurisdiction))
+
+    plans = optimizer.find_optimal_plans(job.year, job.budget, job.max_fractions, top_k=job.top_k)
+    return OptimizationResult(job.employee, job.year, job.jurisdiction, [
+        {
+            "fractions": [(f.start_date.isoformat(), f.end_date.isoformat()) for f in plan.fractions],
+            "days_off": plan.days_off,
+            "efficiency": plan.efficiency,
+        }
+        for plan in plans
+    ])
+
+
+def _run_shard(jobs: List[OptimizationJob]) -> List[OptimizationResult]:
+    return [run_job(job) for job in jobs]
+
+
+def _shards(jobs: List[OptimizationJob], chunk_size: int) -> Tuple[List[List[OptimizationJob]], List[int]]:
+    """
+    Agrupa jobs de mesma jurisdição/ano para que cada worker reaproveite seus planos.
+    Retorna os lotes e a posição original de cada job, na ordem dos lotes.
+    """
+    ordered = sorted(range(len(jobs)), key=lambda i: (jobs[i].jurisdiction, jobs[i].year, jobs[i].budget))
+    return [[jobs[i] for i in ordered[start:start + chunk_size]]
+            for start in range(0, len(ordered), chunk_size)], ordered
+
+
+def run_batch(jobs: Iterable[OptimizationJob], workers: Optional[int] = None,
+              chunk_size: int = BATCH_CHUNK_SIZE,
+              cache: Optional[CalendarCache] = None,
+              calendar_store: Optional[str] = None) -> List[OptimizationResult]:
+    """
+    Executa os jobs em paralelo e retorna os resultados na ordem dos jobs.
+    Com workers=1 tudo roda no processo atual, sem criar o pool. Com
+    calendar_store, os calendários vêm do arquivo pré-computado em vez de
+    serem construídos aqui e serializados para cada worker.
+    """
+    jobs = list(jobs)
+    if cache is None:
+        cache = _calendar_cache
+    workers = workers or os.cpu_count() or 1
+
+    if calendar_store is not None:
+        return _run_batch_from_store(jobs, workers, chunk_size, calendar_store)
+
+    # Construir cada calendário necessário uma única vez, antes de criar o pool
+    keys = sorted({key for job in jobs for key in job.calendar_keys()})
+    calendars = [cache.get(year, jurisdiction) for year, jurisdiction in keys]
+
+    if workers == 1:
+        local_cache = CalendarCache(maxsize=max(len(calendars), 1))
+        for calendar in calendars:
+            local_cache.put(calendar)
+        _worker_optimizers.clear()
+        return [run_job(job, local_cache) for job in jobs]
+
+    return _run_pool(jobs, workers, chunk_size, _init_worker, (calendars,))
+
+
+def _run_batch_from_store(jobs: List[OptimizationJob], workers: int, chunk_size: int,
+                          path: str) -> List[OptimizationResult]:
+    if workers == 1:
+        with CalendarStore(path) as store:
+            local_cache = CalendarCache(builder=store.calendar_or_build)
+            _worker_optimizers.clear()
+            results = [run_job(job, local_cache, store) for job in jobs]
+            _worker_optimizers.clear()
+            return results
+
+    return _run_pool(jobs, workers, chunk_size, _init_worker_from_store, (path,))
+
+
+def _run_pool(jobs: List[OptimizationJob], workers: int, chunk_size: int,
+              initializer, initargs: tuple) -> List[OptimizationResult]:
+    shards, ordered = _shards(jobs, chunk_size)
+    results: List[Optional[OptimizationResult]] = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer,
+                             initargs=initargs) as executor:
+        position = 0
+        for shard_results in executor.map(_run_shard, shards):
+            for result in shard_results:
+                results[ordered[position]] = result
+                position += 1
+    return results
+
+
+def main():
+    """Executa um lote sintético e mostra a vazão obtida"""
+    parser = argparse.ArgumentParser(description="Otimização de férias em lote")
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--years", type=int, nargs="+", default=[2024, 2025, 2026])
+    parser.add_argument("--jurisdictions", nargs="+",
+                        default=[DEFAULT_JURISDICTION, "Rio de Janeiro", "Niterói", "Vitória"])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--calendar-store", help="arquivo de calendários pré-computados")
+    args = parser.parse_args()
+
+    budgets = (30, 60)
+    jobs = [OptimizationJob(f"servidor-{employee}", year, jurisdiction, budgets[employee % len(budgets)])
+            for employee in range(args.employees)
+            for year in args.years
+            for jurisdiction in args.jurisdictions]
+
+    start = time.perf_counter()
+    results = run_batch(jobs, args.workers, calendar_store=args.calendar_store)
+    elapsed = time.perf_counter() - start
+
+    print(f"Jobs executados: {len(results)}")
+    print(f"Workers: {args.workers or os.cpu_count()}")
+    print(f"Tempo total: {elapsed:.2f}s ({len(results) / elapsed:.0f} jobs/s)")
+    for result in results[:3]:
+        print(f"  - {result}")
+
+
+if __name__ == "__main__":
+    main()
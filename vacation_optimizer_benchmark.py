@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Benchmarks do Otimizador de Férias
+----------------------------------
+Mede os caminhos críticos do VacationOptimizer (is_holiday,
+period_contains_holiday, create_bridge_recommendations, apply_smart_fix e
+run_tests) para diferentes quantidades de feriados, períodos candidatos e
+anos, com sementes fixas. O resultado é emitido em JSON para comparação
+entre versões.
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from typing import List, Dict, Any, Callable, Optional
+
+from vacation_optimizer_test import (
+    DateRange, Holiday, Recommendation, VacationOptimizer, CalendarCache
+)
+
+FIRST_YEAR = 2024
+
+
+def _measure(func: Callable[[], Any], repeat: int,
+             setup: Optional[Callable[[], Any]] = None) -> Dict[str, float]:
+    """Executa func `repeat` vezes (setup fora da medição) e resume os tempos em segundos"""
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "repeat": repeat,
+    }
+
+
+def build_optimizer(years: int, extra_holidays: int, seed: int) -> VacationOptimizer:
+    """Otimizador com `years` anos carregados e feriados extras aleatórios (semente fixa)"""
+    rng = random.Random(seed)
+    optimizer = VacationOptimizer(CalendarCache())
+    for year in range(FIRST_YEAR, FIRST_YEAR + years):
+        optimizer.load_holidays(year)
+
+    span = (date(FIRST_YEAR + years - 1, 12, 31) - date(FIRST_YEAR, 1, 1)).days
+    extras = []
+    for _ in range(extra_holidays):
+        holiday_date = date(FIRST_YEAR, 1, 1) + timedelta(days=rng.randint(0, span))
+        extras.append(Holiday(holiday_date.isoformat(), "Feriado sintético", "municipal"))
+    optimizer.add_holidays(extras)
+    return optimizer
+
+
+def random_periods(count: int, years: int, seed: int) -> List[DateRange]:
+    rng = random.Random(seed)
+    span = (date(FIRST_YEAR + years - 1, 12, 31) - date(FIRST_YEAR, 1, 1)).days
+    periods = []
+    for _ in range(count):
+        start = date(FIRST_YEAR, 1, 1) + timedelta(days=rng.randint(0, span))
+        periods.append(DateRange(start, start + timedelta(days=rng.randint(4, 29))))
+    return periods
+
+
+def bench_is_holiday(optimizer: VacationOptimizer, periods: List[DateRange], repeat: int) -> Dict[str, float]:
+    days = [period.start_date for period in periods]
+
+    def run():
+        is_holiday = optimizer.is_holiday
+        for day in days:
+            is_holiday(day)
+
+    return _measure(run, repeat)
+
+
+def bench_period_contains_holiday(optimizer: VacationOptimizer, periods: List[DateRange],
+                                  repeat: int) -> Dict[str, float]:
+    def run():
+        contains = optimizer.period_contains_holiday
+        for period in periods:
+            contains(period)
+
+    return _measure(run, repeat)
+
+
+def bench_create_bridge_recommendations(optimizer: VacationOptimizer, years: int,
+                                        repeat: int) -> Dict[str, float]:
+    def run():
+        for year in range(FIRST_YEAR, FIRST_YEAR + years):
+            optimizer.create_bridge_recommendations(year, 10)
+
+    # Os planos ótimos ficam memorizados; limpar o cache mede o cálculo completo
+    return _measure(run, repeat, setup=optimizer._plan_cache.clear)
+
+
+def bench_apply_smart_fix(optimizer: VacationOptimizer, periods: List[DateRange],
+                          repeat: int) -> Dict[str, float]:
+    recommendations = [Recommendation("Candidato", "", period, 1.0, period.duration_days())
+                       for period in periods]
+
+    def run():
+        optimizer.apply_smart_fix(recommendations)
+
+    return _measure(run, repeat)
+
+
+def bench_run_tests(years: int, seed: int, repeat: int) -> Dict[str, float]:
+    def run():
+        random.seed(seed)
+        optimizer = VacationOptimizer(CalendarCache())
+        for year in range(FIRST_YEAR, FIRST_YEAR + years):
+            optimizer.run_tests(year)
+
+    return _measure(run, repeat)
+
+
+def run_benchmarks(holiday_counts: List[int], period_counts: List[int], year_counts: List[int],
+                   repeat: int, seed: int) -> List[Dict[str, Any]]:
+    results = []
+
+    def record(name: str, params: Dict[str, int], stats: Dict[str, float]):
+        results.append({"name": name, "params": params, **stats})
+        print(f"{name} {params}: mediana {stats['median'] * 1000:.3f} ms", file=sys.stderr)
+
+    for years in year_counts:
+        for extra in holiday_counts:
+            optimizer = build_optimizer(years, extra, seed)
+            holidays = len(optimizer.holidays)
+            for periods_count in period_counts:
+                params = {"years": years, "holidays": holidays, "periods": periods_count}
+                periods = random_periods(periods_count, years, seed)
+                record("is_holiday", params, bench_is_holiday(optimizer, periods, repeat))
+                record("period_contains_holiday", params,
+                       bench_period_contains_holiday(optimizer, periods, repeat))
+                record("apply_smart_fix", params, bench_apply_smart_fix(optimizer, periods, repeat))
+            record("create_bridge_recommendations", {"years": years, "holidays": holidays},
+                   bench_create_bridge_recommendations(optimizer, years, repeat))
+        record("run_tests", {"years": years}, bench_run_tests(years, seed, repeat))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do otimizador de férias")
+    parser.add_argument("--holidays", type=int, nargs="+", default=[0, 100, 1000],
+                        help="feriados sintéticos adicionados aos calendários carregados")
+    parser.add_argument("--periods", type=int, nargs="+", default=[1000, 10000],
+                        help="quantidade de períodos candidatos")
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 3])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": run_benchmarks(args.holidays, args.periods, args.years, args.repeat, args.seed),
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
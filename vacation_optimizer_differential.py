@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+Verificação Diferencial do Otimizador de Férias
+-----------------------------------------------
+Gera calendários e períodos aleatórios (sementes fixas) e confere se cada
+caminho rápido do VacationOptimizer (consulta O(1), validação em lote, correção
+inteligente, busca exata de planos, pontuação, operações de conjunto de
+DateRange, lote lido do arquivo de calendários e índice de lotação mínima)
+concorda exatamente com uma implementação de referência por força bruta,
+medindo o ganho de velocidade sobre as mesmas entradas. Termina com código 1
+se houver divergência.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import List, Dict, Any, Tuple, Optional, Callable
+
+from vacation_optimizer_test import (
+    DEFAULT_JURISDICTION, OFF_RUN_MARGIN, CalendarCache, DateRange, Holiday, HolidayCalendar,
+    Recommendation, VacationOptimizer, build_holiday_calendar
+)
+from vacation_optimizer_batch import OptimizationJob, run_batch
+from vacation_optimizer_staffing import StaffingIndex
+from vacation_optimizer_store import save_calendar_store
+
+FIRST_YEAR = 2024
+HOLIDAY_TYPES = ("national", "municipal", "judicial", "recess")
+# Distância máxima examinada pela busca de janela por força bruta
+REFERENCE_WINDOW_SEARCH = 800
+# Unidade sintética da verificação de lotação mínima
+STAFF = tuple(f"servidor-{i}" for i in range(8))
+MINIMUM_PRESENT = 5
+
+
+# Referências: os laços originais, sem índices
+
+def ref_is_holiday(holidays: List[Holiday], check_date: date) -> Optional[Holiday]:
+    for holiday in holidays:
+        if holiday.date == check_date:
+            return holiday
+    return None
+
+
+def ref_period_contains_holiday(holidays: List[Holiday], period: DateRange) -> List[Holiday]:
+    found = []
+    current = period.start_date
+    while current <= period.end_date:
+        holiday = ref_is_holiday(holidays, current)
+        if holiday:
+            found.append(holiday)
+        current += timedelta(days=1)
+    return found
+
+
+def _holiday_dates(holidays: List[Holiday]) -> set:
+    return {holiday.date for holiday in holidays}
+
+
+def ref_days(period: DateRange) -> set:
+    days = set()
+    current = period.start_date
+    while current <= period.end_date:
+        days.add(current)
+        current += timedelta(days=1)
+    return days
+
+
+def ref_range_operations(periods: List[DateRange]) -> Tuple[List[date], set, set, set]:
+    """Dias, interseção, união e diferença do primeiro período com os demais, dia a dia"""
+    first = ref_days(periods[0])
+    others = [ref_days(period) for period in periods[1:]]
+    return (sorted(first), first.intersection(others[0]), first.union(*others),
+            first.difference(*others))
+
+
+def fast_range_operations(periods: List[DateRange]) -> Tuple[List[date], set, set, set]:
+    first = periods[0]
+    common = first.intersection(periods[1])
+    return (list(first), set(common) if common is not None else set(),
+            {day for period in first.union(*periods[1:]) for day in period},
+            {day for period in first.difference(*periods[1:]) for day in period})
+
+
+def ref_who_is_out(approved: List[Tuple[str, DateRange]], period: DateRange) -> List[Tuple[str, str]]:
+    days = ref_days(period)
+    return sorted((employee, str(absence)) for employee, absence in approved if ref_days(absence) & days)
+
+
+def _ref_out_by_day(approved: List[Tuple[str, DateRange]], exclude: Optional[str] = None) -> Dict[date, int]:
+    out: Dict[date, int] = {}
+    for employee, absence in approved:
+        if employee != exclude:
+            for day in ref_days(absence):
+                out[day] = out.get(day, 0) + 1
+    return out
+
+
+def _ref_runs_below(days: List[date], present: Dict[date, int]) -> List[Tuple[str, int]]:
+    """Trechos contíguos de dias abaixo do mínimo, com a menor presença de cada um"""
+    runs = []
+    run_start = previous = None
+    lowest = 0
+    for day in days:
+        below = present[day] < MINIMUM_PRESENT
+        if below and run_start is not None and day == previous + timedelta(days=1):
+            lowest = min(lowest, present[day])
+        else:
+            if run_start is not None:
+                runs.append((str(DateRange(run_start, previous)), lowest))
+                run_start = None
+            if below:
+                run_start, lowest = day, present[day]
+        previous = day if below else None
+    if run_start is not None:
+        runs.append((str(DateRange(run_start, previous)), lowest))
+    return runs
+
+
+def ref_staffing(approved: List[Tuple[str, DateRange]], employee: str,
+                 period: DateRange) -> Tuple[List[int], List[Tuple[str, int]]]:
+    """Ausentes por dia (sem o servidor) e trechos em que a proposta dele quebra o mínimo"""
+    out = _ref_out_by_day(approved, employee)
+    days = sorted(ref_days(period))
+    counts = [out.get(day, 0) for day in days]
+    present = {day: len(STAFF) - count - 1 for day, count in zip(days, counts)}
+    return counts, _ref_runs_below(days, present)
+
+
+def ref_check_roster(approved: List[Tuple[str, DateRange]],
+                     proposals: List[Tuple[str, DateRange]]) -> List[Tuple[str, int]]:
+    out = _ref_out_by_day(approved + proposals)
+    days = sorted(out)
+    return _ref_runs_below(days, {day: len(STAFF) - out[day] for day in days})
+
+
+def ref_nearest_window(dates: set, period: DateRange) -> Optional[DateRange]:
+    """Janela mais próxima sem feriados, de mesma duração, começando em dia útil (empate: para frente)"""
+    length = period.duration_days()
+
+    def valid(start: date) -> bool:
+        if start.weekday() >= 5:
+            return False
+        return all(start + timedelta(days=i) not in dates for i in range(length))
+
+    for distance in range(REFERENCE_WINDOW_SEARCH):
+        for start in (period.start_date + timedelta(days=distance), period.start_date - timedelta(days=distance)):
+            if valid(start):
+                return DateRange(start, start + timedelta(days=length - 1))
+    return None
+
+
+def ref_smart_fix(holidays: List[Holiday], recommendations: List[Recommendation]) -> List[DateRange]:
+    dates = _holiday_dates(holidays)
+    fixed = []
+    for rec in recommendations:
+        if not ref_period_contains_holiday(holidays, rec.date_range):
+            fixed.append(rec.date_range)
+            continue
+        window = ref_nearest_window(dates, rec.date_range)
+        if window is not None:
+            fixed.append(window)
+    return fixed
+
+
+def _off(dates: set, day: date) -> bool:
+    return day in dates or day.weekday() >= 5
+
+
+def _off_run(dates: set, day: date, step: int) -> int:
+    """Dias de folga consecutivos a partir de `day` na direção `step` (limitados à margem)"""
+    count = 0
+    while count < OFF_RUN_MARGIN and _off(dates, day):
+        count += 1
+        day += timedelta(days=step)
+    return count
+
+
+def ref_score(dates: set, period: DateRange) -> float:
+    days_spent = period.duration_days()
+    before = _off_run(dates, period.start_date - timedelta(days=1), -1)
+    after = _off_run(dates, period.end_date + timedelta(days=1), 1)
+    return (before + days_spent + after) / days_spent
+
+
+def ref_best_days_off(holidays: List[Holiday], year: int, budget: int, max_fractions: int,
+                      min_fraction_days: int, top_k: int) -> List[int]:
+    """
+    Enumera todos os planos (até max_fractions frações que gastam exatamente o
+    orçamento) e retorna os top_k totais de dias de folga. Exponencial: só para
+    orçamentos pequenos.
+    """
+    dates = _holiday_dates(holidays)
+    first = date(year, 1, 1)
+    last = date(year, 12, 31)
+
+    # Frações válidas: começam em dia útil, não contêm feriados e terminam dentro do ano
+    fractions = []
+    day = first
+    while day <= last:
+        if not _off(dates, day):
+            for length in range(min_fraction_days, budget + 1):
+                end = day + timedelta(days=length - 1)
+                if end > last or any(day + timedelta(days=i) in dates for i in range(length)):
+                    break
+                block_start = day - timedelta(days=_off_run(dates, day - timedelta(days=1), -1))
+                block_end = end + timedelta(days=_off_run(dates, end + timedelta(days=1), 1))
+                fractions.append((day, length, block_start, block_end))
+        day += timedelta(days=1)
+
+    totals = []
+
+    def extend(previous_end: Optional[date], remaining: int, fractions_left: int, days_off: int, start: int):
+        if remaining == 0:
+            totals.append(days_off)
+            return
+        if fractions_left == 0:
+            return
+        for i in range(start, len(fractions)):
+            day, length, block_start, block_end = fractions[i]
+            if length > remaining:
+                continue
+            if previous_end is not None and block_start <= previous_end + timedelta(days=1):
+                continue
+            extend(block_end, remaining - length, fractions_left - 1,
+                   days_off + (block_end - block_start).days + 1, i + 1)
+
+    extend(None, budget, max_fractions, 0, 0)
+    totals.sort(reverse=True)
+    return totals[:top_k]
+
+
+# Entradas aleatórias
+
+def random_holidays(rng: random.Random, years: int, count: int) -> List[Holiday]:
+    span = (date(FIRST_YEAR + years - 1, 12, 31) - date(FIRST_YEAR, 1, 1)).days
+    return [Holiday.from_date(date(FIRST_YEAR, 1, 1) + timedelta(days=rng.randint(0, span)),
+                              f"Feriado {i}", rng.choice(HOLIDAY_TYPES))
+            for i in range(count)]
+
+
+def random_periods(rng: random.Random, years: int, count: int) -> List[DateRange]:
+    span = (date(FIRST_YEAR + years - 1, 12, 31) - date(FIRST_YEAR, 1, 1)).days
+    periods = []
+    for _ in range(count):
+        start = date(FIRST_YEAR, 1, 1) + timedelta(days=rng.randint(0, span))
+        periods.append(DateRange(start, start + timedelta(days=rng.randint(0, 29))))
+    return periods
+
+
+def store_calendars(rng: random.Random, years: int, extra: int) -> List[HolidayCalendar]:
+    """
+    Calendários padrão com feriados extras, um deles dentro da primeira fração do
+    melhor plano padrão: um lote que ignore o arquivo devolve esse plano e diverge
+    """
+    template = VacationOptimizer(CalendarCache())
+    calendars = []
+    for year in range(FIRST_YEAR, FIRST_YEAR + years + 1):
+        template.load_holidays(year)
+        template.load_holidays(year + 1)
+        fraction = template.find_optimal_plans(year, top_k=1)[0].fractions[0]
+        first = date(year, 1, 1).toordinal()
+        last = date(year, 12, 31).toordinal()
+        ordinals = [fraction.start_ordinal + 1] + [rng.randint(first, last) for _ in range(extra)]
+        calendars.append(HolidayCalendar(year, DEFAULT_JURISDICTION, list(build_holiday_calendar(year).holidays) + [
+            Holiday.from_date(date.fromordinal(ordinal), "Feriado do arquivo", "municipal") for ordinal in ordinals
+        ]))
+    return calendars
+
+
+def ref_store_plans(calendars: List[HolidayCalendar], jobs: List[OptimizationJob]) -> List[List[Tuple[str, str]]]:
+    """Planos de um otimizador que recebe os mesmos calendários diretamente, sem arquivo"""
+    optimizer = VacationOptimizer(CalendarCache())
+    for calendar in calendars:
+        optimizer.load_calendar(calendar)
+    return [[(f.start_date.isoformat(), f.end_date.isoformat()) for f in plan.fractions]
+            for job in jobs
+            for plan in optimizer.find_optimal_plans(job.year, job.budget, job.max_fractions, top_k=job.top_k)]
+
+
+def _timed(func: Callable[[], Any]) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+class CheckResult:
+    def __init__(self, name: str):
+        self.name = name
+        self.cases = 0
+        self.mismatches = 0
+        self.reference_time = 0.0
+        self.fast_time = 0.0
+        # Primeiras divergências encontradas, para diagnóstico
+        self.examples: List[str] = []
+
+    def record(self, cases: int, mismatches: List[str], reference_time: float, fast_time: float):
+        self.cases += cases
+        self.mismatches += len(mismatches)
+        self.examples.extend(mismatches[:max(0, 3 - len(self.examples))])
+        self.reference_time += reference_time
+        self.fast_time += fast_time
+
+    @property
+    def speedup(self) -> float:
+        return self.reference_time / self.fast_time if self.fast_time > 0 else float("inf")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "cases": self.cases,
+            "mismatches": self.mismatches,
+            "reference_seconds": self.reference_time,
+            "fast_seconds": self.fast_time,
+            "speedup": self.speedup,
+            "examples": self.examples,
+        }
+
+
+def run_checks(seeds: List[int], years: int, holidays: int, periods: int,
+               plan_budget: int, plan_checks: int) -> List[CheckResult]:
+    checks = {name: CheckResult(name) for name in (
+        "is_holiday", "period_contains_holiday", "validate_batch", "apply_smart_fix",
+        "score_period", "find_optimal_plans", "date_range_sets", "calendar_store",
+        "staffing_who_is_out", "staffing_shortages", "staffing_check_roster")}
+
+    for seed in seeds:
+        rng = random.Random(seed)
+        holiday_list = random_holidays(rng, years, holidays)
+        optimizer = VacationOptimizer(CalendarCache())
+        optimizer.add_holidays(holiday_list)
+        # A referência vê os feriados na mesma ordem que o otimizador (o primeiro da data prevalece)
+        reference = list(optimizer.holidays)
+        dates = _holiday_dates(reference)
+        period_list = random_periods(rng, years, periods)
+        days = [period.start_date for period in period_list]
+
+        expected, ref_time = _timed(lambda: [ref_is_holiday(reference, day) for day in days])
+        got, fast_time = _timed(lambda: [optimizer.is_holiday(day) for day in days])
+        checks["is_holiday"].record(len(days), [
+            f"seed {seed}: {day} -> {e} != {g}" for day, e, g in zip(days, expected, got) if e is not g
+        ], ref_time, fast_time)
+
+        expected, ref_time = _timed(lambda: [ref_period_contains_holiday(reference, p) for p in period_list])
+        got, fast_time = _timed(lambda: [optimizer.period_contains_holiday(p) for p in period_list])
+        checks["period_contains_holiday"].record(len(period_list), [
+            f"seed {seed}: {p}" for p, e, g in zip(period_list, expected, got) if e != g
+        ], ref_time, fast_time)
+        reference_flags = [bool(holidays_in_period) for holidays_in_period in expected]
+
+        starts = [p.start_ordinal for p in period_list]
+        ends = [p.end_ordinal for p in period_list]
+        optimizer.validate_batch(starts[:1], ends[:1])  # cópia em NumPy fora da medição
+        (mask, _), fast_time = _timed(lambda: optimizer.validate_batch(starts, ends))
+        checks["validate_batch"].record(len(period_list), [
+            f"seed {seed}: {p}" for p, e, g in zip(period_list, reference_flags, mask) if e != bool(g)
+        ], ref_time, fast_time)
+
+        recommendations = [Recommendation("Candidato", "", p, 1.0, p.duration_days()) for p in period_list]
+        expected, ref_time = _timed(lambda: ref_smart_fix(reference, recommendations))
+        got, fast_time = _timed(lambda: [rec.date_range for rec in optimizer.apply_smart_fix(recommendations)])
+        mismatches = [f"seed {seed}: {len(expected)} períodos != {len(got)}"] if len(expected) != len(got) else [
+            f"seed {seed}: {e} != {g}" for e, g in zip(expected, got)
+            if (e.start_date, e.end_date) != (g.start_date, g.end_date)
+        ]
+        checks["apply_smart_fix"].record(len(recommendations), mismatches, ref_time, fast_time)
+
+        expected, ref_time = _timed(lambda: [ref_score(dates, p) for p in period_list])
+        optimizer._score_cache.clear()
+        got, fast_time = _timed(lambda: [optimizer.score_period(p) for p in period_list])
+        checks["score_period"].record(len(period_list), [
+            f"seed {seed}: {p} {e} != {g}" for p, e, g in zip(period_list, expected, got) if abs(e - g) > 1e-12
+        ], ref_time, fast_time)
+
+        # Vizinhos na ordem de início, para que os períodos de cada grupo se sobreponham
+        by_start = sorted(period_list, key=lambda period: period.start_ordinal)
+        groups = []
+        for _ in range(len(period_list) // 4):
+            first = rng.randrange(len(by_start) - 4)
+            groups.append(by_start[first:first + rng.randint(2, 4)])
+        expected, ref_time = _timed(lambda: [ref_range_operations(group) for group in groups])
+        got, fast_time = _timed(lambda: [fast_range_operations(group) for group in groups])
+        checks["date_range_sets"].record(len(groups), [
+            f"seed {seed}: {[str(period) for period in group]}"
+            for group, e, g in zip(groups, expected, got) if e != g
+        ], ref_time, fast_time)
+
+        for _ in range(plan_checks):
+            year = rng.randint(FIRST_YEAR, FIRST_YEAR + years - 1)
+            budget = rng.randint(5, plan_budget)
+            max_fractions = rng.randint(1, 2)
+            expected, ref_time = _timed(lambda: ref_best_days_off(reference, year, budget, max_fractions, 5, 5))
+            optimizer._plan_cache.clear()
+            got, fast_time = _timed(lambda: [plan.days_off for plan in
+                                             optimizer.find_optimal_plans(year, budget, max_fractions, 5, 5)])
+            checks["find_optimal_plans"].record(1, [] if expected == got else [
+                f"seed {seed}: {year} orçamento {budget} em {max_fractions} frações: {expected} != {got}"
+            ], ref_time, fast_time)
+
+        approved = [(rng.choice(STAFF), period) for period in period_list[:len(period_list) // 20]]
+        proposals = [(rng.choice(STAFF), period) for period in random_periods(rng, years, len(approved) // 4)]
+        queries = period_list[:len(period_list) // 10]
+        staffing, fast_time = _timed(lambda: StaffingIndex(len(STAFF), MINIMUM_PRESENT, approved))
+
+        expected, ref_time = _timed(lambda: [ref_who_is_out(approved, period) for period in queries])
+        got, query_time = _timed(lambda: [sorted((employee, str(absence)) for employee, absence
+                                                 in staffing.who_is_out(period)) for period in queries])
+        checks["staffing_who_is_out"].record(len(queries), [
+            f"seed {seed}: {period}" for period, e, g in zip(queries, expected, got) if e != g
+        ], ref_time, fast_time + query_time)
+
+        employees = [rng.choice(STAFF) for _ in queries]
+        expected, ref_time = _timed(lambda: [ref_staffing(approved, employee, period)
+                                             for employee, period in zip(employees, queries)])
+        got, query_time = _timed(lambda: [
+            (staffing.absence_counts(period, employee),
+             [(str(run), present) for run, present in staffing.shortages(employee, period)])
+            for employee, period in zip(employees, queries)])
+        checks["staffing_shortages"].record(len(queries), [
+            f"seed {seed}: {employee} {period}"
+            for employee, period, e, g in zip(employees, queries, expected, got) if e != g
+        ], ref_time, query_time)
+
+        expected, ref_time = _timed(lambda: ref_check_roster(approved, proposals))
+        got, query_time = _timed(lambda: [(str(run), present) for run, present in staffing.check_roster(proposals)])
+        checks["staffing_check_roster"].record(1, [] if expected == got else [
+            f"seed {seed}: {expected[:2]} != {got[:2]}"
+        ], ref_time, query_time)
+
+        calendars = store_calendars(rng, years, holidays // years)
+        jobs = [OptimizationJob(f"servidor-{year}", year) for year in range(FIRST_YEAR, FIRST_YEAR + years)]
+        expected, ref_time = _timed(lambda: ref_store_plans(calendars, jobs))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "calendarios.bin")
+            save_calendar_store(path, calendars)
+            for workers in (1, 2):
+                results, fast_time = _timed(lambda: run_batch(jobs, workers, calendar_store=path))
+                got = [[tuple(fraction) for fraction in plan["fractions"]] for result in results for plan in result.plans]
+                checks["calendar_store"].record(len(jobs), [] if expected == got else [
+                    f"seed {seed}: {workers} worker(s): {expected[:1]} != {got[:1]}"
+                ], ref_time, fast_time)
+
+    return list(checks.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verificação diferencial dos caminhos rápidos")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1, 2, 3, 4, 5])
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--holidays", type=int, default=60, help="feriados aleatórios por calendário")
+    parser.add_argument("--periods", type=int, default=2000, help="períodos aleatórios por calendário")
+    parser.add_argument("--plan-budget", type=int, default=12,
+                        help="maior orçamento na comparação com a enumeração completa de planos")
+    parser.add_argument("--plan-checks", type=int, default=3, help="buscas de planos por calendário")
+    parser.add_argument("--json", action="store_true", help="emite o relatório em JSON")
+    args = parser.parse_args()
+
+    results = run_checks(args.seeds, args.years, args.holidays, args.periods, args.plan_budget, args.plan_checks)
+    failed = any(result.mismatches for result in results)
+
+    if args.json:
+        json.dump({"seeds": args.seeds, "results": [result.to_dict() for result in results]},
+                  sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        print(f"{'Verificação':<26}{'Casos':>8}{'Diverg.':>9}{'Ref (ms)':>11}{'Rápido (ms)':>13}{'Ganho':>9}")
+        for result in results:
+            print(f"{result.name:<26}{result.cases:>8}{result.mismatches:>9}"
+                  f"{result.reference_time * 1000:>11.1f}{result.fast_time * 1000:>13.2f}{result.speedup:>8.1f}x")
+            for example in result.examples:
+                print(f"    {example}")
+        print("✅ Todos os caminhos rápidos concordam com a referência" if not failed
+              else "❌ Há divergências entre caminhos rápidos e referência")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
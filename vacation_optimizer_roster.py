@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Otimização Conjunta de Férias da Unidade
+----------------------------------------
+Distribui as férias de todos os servidores de uma unidade respeitando a lotação
+mínima diária. Cada servidor parte dos seus melhores planos individuais
+(find_optimal_plans) e uma busca local troca planos inteiros ou frações
+isoladas, primeiro eliminando os dias abaixo do mínimo e depois maximizando a
+eficiência total (dias de folga por dia de férias gasto), até o limite de tempo.
+"""
+
+import argparse
+import math
+import random
+import time
+from typing import List, Dict, Tuple, Optional, Sequence
+
+from vacation_optimizer_test import (
+    DAY_WORKDAY, DEFAULT_JURISDICTION, MAX_FRACTIONS, MIN_FRACTION_DAYS, OFF_RUN_MARGIN,
+    CalendarCache, DateRange, VacationOptimizer, VacationPlan, plan_efficiency
+)
+from vacation_optimizer_staffing import StaffingIndex
+
+# Planos individuais considerados por servidor
+ROSTER_CANDIDATES = 20
+ROSTER_TIME_LIMIT = 5.0
+# Cada servidor-dia abaixo da lotação mínima pesa mais que qualquer ganho de eficiência
+SHORTAGE_PENALTY = 1000.0
+# Probabilidade de trocar o plano inteiro (no resto das iterações troca-se uma fração)
+PLAN_MOVE_PROBABILITY = 0.3
+# Temperaturas do recozimento, na escala da eficiência de um servidor
+INITIAL_TEMPERATURE = 0.5
+FINAL_TEMPERATURE = 0.005
+
+# Fração: (dia no ano, duração, dias ganhos nas bordas, início e fim do bloco de folga)
+# com o bloco em índices estendidos (0 = OFF_RUN_MARGIN dias antes de 1/1)
+Fraction = Tuple[int, int, int, int, int]
+
+
+class RosterEmployee:
+    __slots__ = ("name", "budget", "max_fractions", "min_fraction_days")
+
+    def __init__(self, name: str, budget: int = 30, max_fractions: int = MAX_FRACTIONS,
+                 min_fraction_days: int = MIN_FRACTION_DAYS):
+        self.name = name
+        self.budget = budget
+        self.max_fractions = max_fractions
+        self.min_fraction_days = min_fraction_days
+
+    def plan_key(self) -> Tuple[int, int, int]:
+        return (self.budget, self.max_fractions, self.min_fraction_days)
+
+
+class RosterResult:
+    def __init__(self, year: int, assignments: List[Tuple[RosterEmployee, VacationPlan]],
+                 shortages: List[Tuple[DateRange, int]], iterations: int, elapsed: float):
+        self.year = year
+        self.assignments = assignments
+        # Trechos abaixo da lotação mínima que restaram (vazio quando o roster é viável)
+        self.shortages = shortages
+        self.iterations = iterations
+        self.elapsed = elapsed
+
+    @property
+    def feasible(self) -> bool:
+        return not self.shortages
+
+    @property
+    def total_efficiency(self) -> float:
+        return sum(plan.efficiency for _, plan in self.assignments)
+
+    @property
+    def mean_efficiency(self) -> float:
+        return self.total_efficiency / len(self.assignments) if self.assignments else 0.0
+
+    def proposals(self) -> List[Tuple[str, DateRange]]:
+        """Frações atribuídas no formato aceito por StaffingIndex"""
+        return [(employee.name, fraction) for employee, plan in self.assignments for fraction in plan.fractions]
+
+    def __str__(self):
+        status = "viável" if self.feasible else f"{len(self.shortages)} trechos abaixo do mínimo"
+        return (f"Roster {self.year}: {len(self.assignments)} servidores, eficiência média "
+                f"{self.mean_efficiency:.2f}, {status} ({self.iterations} iterações em {self.elapsed:.2f}s)")
+
+
+class RosterOptimizer:
+    """
+    Busca local sobre o roster de uma unidade. O otimizador precisa estar com os
+    feriados do ano (e do ano seguinte, por causa do recesso) já carregados; a
+    lotação mínima e os períodos já aprovados vêm do StaffingIndex.
+    """
+
+    def __init__(self, optimizer: VacationOptimizer, year: int, staffing: StaffingIndex,
+                 candidates: int = ROSTER_CANDIDATES, seed: int = 0):
+        self.optimizer = optimizer
+        self.year = year
+        self.staffing = staffing
+        self.candidates = candidates
+        self.rng = random.Random(seed)
+
+        calendar = optimizer.get_year_calendar(year)
+        self._first_ordinal = calendar.first_ordinal
+        self._size = len(calendar.day_types)
+        self._before, self._after = optimizer.year_off_runs(year)
+
+        # Mesmas frações da busca exata: sem feriados nem dias bloqueados
+        day_types = calendar.day_types
+        self._free_run = optimizer.free_runs(year)
+        self._workdays = [day for day in range(self._size) if day_types[day] == DAY_WORKDAY]
+
+        self._pools: Dict[int, List[Fraction]] = {}
+        self._options: Dict[Tuple[int, int, int], List[Tuple[Fraction, ...]]] = {}
+
+    def _fraction(self, day: int, length: int) -> Fraction:
+        x = day + OFF_RUN_MARGIN
+        end = x + length - 1
+        before = self._before[x]
+        after = self._after[end]
+        return (day, length, before + after, x - before, end + after)
+
+    def _pool(self, length: int) -> List[Fraction]:
+        """Todas as frações válidas de `length` dias: começam em dia útil, sem feriados nem dias bloqueados"""
+        pool = self._pools.get(length)
+        if pool is None:
+            free_run = self._free_run
+            pool = [self._fraction(day, length) for day in self._workdays if free_run[day] >= length]
+            self._pools[length] = pool
+        return pool
+
+    def _plan_options(self, employee: RosterEmployee) -> List[Tuple[Fraction, ...]]:
+        """Melhores planos individuais, compartilhados entre servidores com as mesmas regras"""
+        key = employee.plan_key()
+        options = self._options.get(key)
+        if options is None:
+            plans = self.optimizer.find_optimal_plans(self.year, employee.budget, employee.max_fractions,
+                                                      employee.min_fraction_days, top_k=self.candidates)
+            options = [tuple(sorted(self._fraction(f.start_ordinal - self._first_ordinal,
+                                                   f.duration_days())
+                                    for f in plan.fractions))
+                       for plan in plans]
+            self._options[key] = options
+        return options
+
+    @staticmethod
+    def _compatible(fractions: Sequence[Fraction]) -> bool:
+        """Mesmo critério da busca exata: blocos de frações diferentes não se tocam"""
+        for previous, current in zip(fractions, fractions[1:]):
+            if current[3] <= previous[4] + 1 or current[0] <= previous[0]:
+                return False
+        return True
+
+    def _to_plan(self, fractions: Sequence[Fraction]) -> VacationPlan:
+        first = self._first_ordinal
+        origin = first - OFF_RUN_MARGIN
+        return VacationPlan(
+            [DateRange.from_ordinals(first + day, first + day + length - 1)
+             for day, length, _, _, _ in fractions],
+            [DateRange.from_ordinals(origin + block_start, origin + block_end)
+             for _, _, _, block_start, block_end in fractions],
+        )
+
+    def solve(self, employees: Sequence[RosterEmployee], time_limit: float = ROSTER_TIME_LIMIT,
+              max_iterations: Optional[int] = None) -> RosterResult:
+        start_time = time.perf_counter()
+        rng = self.rng
+        size = self._size
+
+        # Ausentes por dia do ano, já contando os períodos aprovados
+        out = self.staffing.absence_counts(DateRange.from_ordinals(self._first_ordinal,
+                                                                   self._first_ordinal + size - 1))
+        capacity = self.staffing.headcount - self.staffing.minimum_present
+
+        def apply(fractions: Sequence[Fraction], sign: int) -> int:
+            """Aplica (+1) ou retira (-1) as frações e retorna a variação dos servidor-dias em falta"""
+            excess = 0
+            for day, length, _, _, _ in fractions:
+                for d in range(day, day + length):
+                    if sign > 0:
+                        if out[d] >= capacity:
+                            excess += 1
+                        out[d] += 1
+                    else:
+                        out[d] -= 1
+                        if out[d] >= capacity:
+                            excess -= 1
+            return excess
+
+        def efficiency(employee: RosterEmployee, fractions: Sequence[Fraction]) -> float:
+            # Mesma definição de VacationPlan.efficiency, sem montar o plano
+            days_spent = sum(f[1] for f in fractions)
+            return plan_efficiency(days_spent, days_spent + sum(f[2] for f in fractions))
+
+        # Solução inicial gulosa: cada servidor pega o melhor plano que menos fere o mínimo
+        options = [self._plan_options(employee) for employee in employees]
+        assignment: List[Tuple[Fraction, ...]] = []
+        for employee, choices in zip(employees, options):
+            best = None
+            best_score = None
+            for fractions in choices:
+                added = sum(1 for day, length, _, _, _ in fractions
+                            for d in range(day, day + length) if out[d] >= capacity)
+                score = (added, -efficiency(employee, fractions))
+                if best_score is None or score < best_score:
+                    best, best_score = fractions, score
+            assignment.append(best or ())
+            apply(best or (), 1)
+
+        # Recozimento simulado: movimentos que não pioram são sempre aceitos; os que
+        # pioram, com probabilidade decrescente ao longo do tempo disponível
+        iterations = 0
+        temperature = INITIAL_TEMPERATURE
+        excess = sum(max(count - capacity, 0) for count in out)
+        total = sum(efficiency(employee, fractions) for employee, fractions in zip(employees, assignment))
+        best_value = total - SHORTAGE_PENALTY * excess
+        best_assignment = list(assignment)
+        while employees:
+            if iterations % 256 == 0:
+                progress = (time.perf_counter() - start_time) / time_limit if time_limit > 0 else 1.0
+                if max_iterations is not None:
+                    progress = max(progress, iterations / max_iterations)
+                if progress >= 1.0:
+                    break
+                temperature = INITIAL_TEMPERATURE * (FINAL_TEMPERATURE / INITIAL_TEMPERATURE) ** progress
+            iterations += 1
+
+            index = rng.randrange(len(employees))
+            employee = employees[index]
+            current = assignment[index]
+            if not current:
+                continue
+            if rng.random() < PLAN_MOVE_PROBABILITY:
+                candidate = rng.choice(options[index])
+            else:
+                position = rng.randrange(len(current))
+                replacement = rng.choice(self._pool(current[position][1]))
+                candidate = tuple(sorted(current[:position] + current[position + 1:] + (replacement,)))
+                if not self._compatible(candidate):
+                    continue
+            if candidate == current:
+                continue
+
+            delta = apply(current, -1) + apply(candidate, 1)
+            gain = efficiency(employee, candidate) - efficiency(employee, current)
+            score = gain - SHORTAGE_PENALTY * delta
+            if score >= 0 or rng.random() < math.exp(score / temperature):
+                assignment[index] = candidate
+                excess += delta
+                total += gain
+                value = total - SHORTAGE_PENALTY * excess
+                if value > best_value:
+                    best_value = value
+                    best_assignment = list(assignment)
+            else:
+                apply(candidate, -1)
+                apply(current, 1)
+
+        assignments = [(employee, self._to_plan(fractions))
+                       for employee, fractions in zip(employees, best_assignment)]
+        result = RosterResult(self.year, assignments, [], iterations, 0.0)
+        result.shortages = self.staffing.check_roster(result.proposals())
+        result.elapsed = time.perf_counter() - start_time
+        return result
+
+
+def main():
+    """Unidade sintética: todos com 30 dias em até 3 frações e uma lotação mínima diária"""
+    parser = argparse.ArgumentParser(description="Otimização conjunta de férias da unidade")
+    parser.add_argument("--employees", type=int, default=200)
+    parser.add_argument("--year", type=int, default=2025)
+    parser.add_argument("--minimum", type=float, default=0.8,
+                        help="fração mínima de servidores presentes em cada dia")
+    parser.add_argument("--jurisdiction", default=DEFAULT_JURISDICTION)
+    parser.add_argument("--time-limit", type=float, default=ROSTER_TIME_LIMIT)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    optimizer = VacationOptimizer(CalendarCache())
+    optimizer.load_holidays(args.year, args.jurisdiction)
+    optimizer.load_holidays(args.year + 1, args.jurisdiction)
+
+    employees = [RosterEmployee(f"servidor-{i}", budget=30) for i in range(args.employees)]
+    staffing = StaffingIndex(args.employees, int(args.employees * args.minimum))
+
+    best = optimizer.find_optimal_plans(args.year, 30)[0]
+    individual = [(employee.name, fraction) for employee in employees for fraction in best.fractions]
+    print(f"Todos com o melhor plano individual: eficiência {best.efficiency:.2f}, "
+          f"{len(staffing.check_roster(individual))} trechos abaixo do mínimo")
+
+    result = RosterOptimizer(optimizer, args.year, staffing, seed=args.seed).solve(employees, args.time_limit)
+    print(result)
+    for run, present in result.shortages[:5]:
+        print(f"  - {run}: {present} presentes")
+
+
+if __name__ == "__main__":
+    main()
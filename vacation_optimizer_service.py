@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Serviço HTTP do Otimizador de Férias
+------------------------------------
+Servidor asyncio (somente biblioteca padrão) com três endpoints:
+
+    /validate   ?start=AAAA-MM-DD&end=AAAA-MM-DD[&jurisdiction=...]
+    /adjust     ?start=AAAA-MM-DD&end=AAAA-MM-DD[&jurisdiction=...]
+    /plan       ?year=AAAA[&budget=30&max_fractions=3&top_k=3&jurisdiction=...]
+
+Os parâmetros podem vir na query string ou num corpo JSON (POST). Requisições
+idênticas simultâneas são agrupadas numa única execução, as respostas ficam
+num cache LRU e a busca de planos (CPU) roda num executor, fora do loop.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date
+from typing import Dict, Any, Tuple, Optional, Callable, Awaitable
+from urllib.parse import urlsplit, parse_qsl
+
+from vacation_optimizer_test import (
+    DEFAULT_JURISDICTION, KNOWN_JURISDICTIONS, MAX_FRACTIONS, CalendarCache, DateRange, VacationOptimizer,
+    parse_holiday_date, _calendar_cache
+)
+from vacation_optimizer_batch import OptimizationJob, run_job, _init_worker_from_store
+from vacation_optimizer_store import CalendarStore
+
+RESPONSE_CACHE_SIZE = 1024
+# Limite do corpo das requisições (os parâmetros cabem com folga)
+MAX_BODY_SIZE = 64 * 1024
+# Faixas aceitas nos parâmetros (o ano seguinte também é carregado, por causa do recesso)
+MIN_YEAR = 1900
+MAX_YEAR = 2200
+MAX_BUDGET = 365
+MAX_TOP_K = 20
+# Otimizadores das consultas rápidas mantidos em memória (LRU por jurisdição)
+SERVICE_OPTIMIZERS = 16
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class ServiceError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ResponseCache:
+    """Cache LRU de respostas já serializadas, por chave da requisição"""
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._responses: "OrderedDict[Tuple, bytes]" = OrderedDict()
+
+    def get(self, key: Tuple) -> Optional[bytes]:
+        body = self._responses.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._responses.move_to_end(key)
+        return body
+
+    def put(self, key: Tuple, body: bytes):
+        self._responses[key] = body
+        self._responses.move_to_end(key)
+        if len(self._responses) > self.maxsize:
+            self._responses.popitem(last=False)
+
+    def clear(self):
+        self._responses.clear()
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+
+def _date_param(params: Dict[str, Any], name: str) -> date:
+    if name not in params:
+        raise ServiceError(400, f"Parâmetro obrigatório ausente: {name}")
+    try:
+        return parse_holiday_date(str(params[name]))
+    except ValueError:
+        raise ServiceError(400, f"Data inválida em {name}: {params[name]}")
+
+
+def _int_param(params: Dict[str, Any], name: str, default: Optional[int] = None,
+               minimum: Optional[int] = None, maximum: Optional[int] = None) -> int:
+    value = params.get(name, default)
+    if value is None:
+        raise ServiceError(400, f"Parâmetro obrigatório ausente: {name}")
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ServiceError(400, f"Inteiro inválido em {name}: {value}")
+    if (minimum is not None and number < minimum) or (maximum is not None and number > maximum):
+        raise ServiceError(400, f"{name} fora da faixa {minimum}..{maximum}: {number}")
+    return number
+
+
+def _period_param(params: Dict[str, Any]) -> DateRange:
+    start = _date_param(params, "start")
+    end = _date_param(params, "end")
+    if end < start:
+        raise ServiceError(400, "O fim do período é anterior ao início")
+    if start.year < MIN_YEAR or end.year > MAX_YEAR:
+        raise ServiceError(400, f"Período fora dos anos {MIN_YEAR}..{MAX_YEAR}")
+    return DateRange(start, end)
+
+
+def _mp_context():
+    """
+    Workers são criados com forkserver (ou spawn) em vez de fork: o pool nasce
+    sob demanda dentro do loop asyncio, e um fork nesse ponto herda o estado do
+    loop e pode travar o worker.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _period_dict(period: Optional[DateRange]) -> Optional[Dict[str, str]]:
+    if period is None:
+        return None
+    return {"start": period.start_date.isoformat(), "end": period.end_date.isoformat()}
+
+
+class OptimizerService:
+    """
+    Camada assíncrona sobre o VacationOptimizer. Validação e ajuste são consultas
+    aos índices (rodam no próprio loop); a busca de planos vai para o executor.
+    Com workers=1 o executor é uma thread, caso contrário um pool de processos.
+    """
+
+    def __init__(self, workers: Optional[int] = 1, calendar_store: Optional[str] = None,
+                 cache_size: int = RESPONSE_CACHE_SIZE, calendar_cache: Optional[CalendarCache] = None):
+        self._store = CalendarStore(calendar_store) if calendar_store else None
+        if calendar_cache is None:
+            calendar_cache = (CalendarCache(builder=self._store.calendar_or_build)
+                              if self._store else _calendar_cache)
+        self.calendar_cache = calendar_cache
+        self.responses = ResponseCache(cache_size)
+
+        # A thread do executor tem seu próprio cache e sua própria leitura do arquivo:
+        # CalendarCache não é thread-safe e o loop continua usando self.calendar_cache
+        self._executor_store: Optional[CalendarStore] = None
+        self._executor_cache: Optional[CalendarCache] = None
+        if workers == 1:
+            self.executor: Executor = ThreadPoolExecutor(max_workers=1)
+            self._remote = False
+            if calendar_store:
+                self._executor_store = CalendarStore(calendar_store)
+                self._executor_cache = CalendarCache(builder=self._executor_store.calendar_or_build)
+            else:
+                self._executor_cache = CalendarCache(builder=calendar_cache.builder)
+        elif calendar_store:
+            self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context(),
+                                                initializer=_init_worker_from_store,
+                                                initargs=(calendar_store,))
+            self._remote = True
+        else:
+            self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context())
+            self._remote = True
+
+        # Jurisdições aceitas: as que sabemos construir e as que vêm no arquivo
+        self.jurisdictions = set(KNOWN_JURISDICTIONS)
+        if self._store is not None:
+            self.jurisdictions.update(jurisdiction for _, jurisdiction in self._store.keys())
+        # Otimizadores usados pelas consultas rápidas, um por jurisdição, os menos usados descartados
+        self._optimizers: "OrderedDict[str, VacationOptimizer]" = OrderedDict()
+        # Execuções em andamento, para agrupar requisições idênticas simultâneas
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self.requests = 0
+        self.coalesced = 0
+        self.computed = 0
+
+    def _require_calendars(self, jurisdiction: str, first_year: int, last_year: int):
+        """Jurisdições que só existem no arquivo não podem ser construídas fora dos anos gravados"""
+        if jurisdiction in KNOWN_JURISDICTIONS:
+            return
+        for year in range(first_year, last_year + 2):
+            if (year, jurisdiction) not in self._store:
+                raise ServiceError(404, f"Calendário indisponível: {jurisdiction} {year}")
+
+    def _optimizer(self, jurisdiction: str, first_year: int, last_year: int) -> VacationOptimizer:
+        self._require_calendars(jurisdiction, first_year, last_year)
+        optimizer = self._optimizers.get(jurisdiction)
+        if optimizer is None:
+            optimizer = VacationOptimizer(self.calendar_cache)
+            if self._store is not None:
+                self._store.load_into(optimizer, jurisdiction)
+            self._optimizers[jurisdiction] = optimizer
+            if len(self._optimizers) > SERVICE_OPTIMIZERS:
+                self._optimizers.popitem(last=False)
+        else:
+            self._optimizers.move_to_end(jurisdiction)
+        # O recesso de dezembro vem no calendário do ano seguinte
+        for year in range(first_year, last_year + 2):
+            optimizer.load_holidays(year, jurisdiction)
+        return optimizer
+
+    async def _coalesced(self, key: Tuple, compute: Callable[[], Awaitable[Dict[str, Any]]]) -> bytes:
+        """Resposta do cache, da execução idêntica em andamento ou de uma nova execução"""
+        self.requests += 1
+        body = self.responses.get(key)
+        if body is not None:
+            return body
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            self.computed += 1
+            body = json.dumps(await compute(), ensure_ascii=False).encode("utf-8")
+            self.responses.put(key, body)
+            future.set_result(body)
+            return body
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Evita o aviso de exceção não recuperada quando ninguém mais aguardava
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def validate(self, period: DateRange, jurisdiction: str = DEFAULT_JURISDICTION) -> bytes:
+        async def compute():
+            optimizer = self._optimizer(jurisdiction, period.start_date.year, period.end_date.year)
+            holidays = optimizer.period_contains_holiday(period)
+            return {
+                "period": _period_dict(period),
+                "jurisdiction": jurisdiction,
+                "valid": not holidays,
+                "holidays": [{"date": h.date.isoformat(), "name": h.name, "type": h.type}
+                             for h in holidays],
+            }
+
+        return await self._coalesced(("validate", jurisdiction, period.start_date, period.end_date), compute)
+
+    async def adjust(self, period: DateRange, jurisdiction: str = DEFAULT_JURISDICTION) -> bytes:
+        async def compute():
+            optimizer = self._optimizer(jurisdiction, period.start_date.year - 1, period.end_date.year + 1)
+            if optimizer.period_contains_holiday(period):
+                adjusted = optimizer.find_nearest_window(period)
+            else:
+                adjusted = period
+            return {
+                "period": _period_dict(period),
+                "jurisdiction": jurisdiction,
+                "adjusted": _period_dict(adjusted),
+                "changed": adjusted is not period,
+            }
+
+        return await self._coalesced(("adjust", jurisdiction, period.start_date, period.end_date), compute)
+
+    async def best_plan(self, year: int, budget: int = 30, max_fractions: int = MAX_FRACTIONS,
+                        top_k: int = 3, jurisdiction: str = DEFAULT_JURISDICTION) -> bytes:
+        self._require_calendars(jurisdiction, year, year)
+        job = OptimizationJob("servico", year, jurisdiction, budget, max_fractions, top_k)
+
+        async def compute():
+            loop = asyncio.get_running_loop()
+            if self._remote:
+                result = await loop.run_in_executor(self.executor, run_job, job)
+            else:
+                result = await loop.run_in_executor(self.executor, run_job, job, self._executor_cache,
+                                                    self._executor_store)
+            return {"year": year, "jurisdiction": jurisdiction, "budget": budget, "plans": result.plans}
+
+        return await self._coalesced(("plan", jurisdiction, year, budget, max_fractions, top_k), compute)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "computed": self.computed,
+            "cache_hits": self.responses.hits,
+            "cached_responses": len(self.responses),
+        }
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, bytes]:
+        """Roteia uma requisição e retorna (status, corpo JSON)"""
+        url = urlsplit(target)
+        params: Dict[str, Any] = dict(parse_qsl(url.query))
+        if body:
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                raise ServiceError(400, "Corpo JSON inválido")
+            if not isinstance(payload, dict):
+                raise ServiceError(400, "O corpo JSON deve ser um objeto")
+            params.update(payload)
+        if method not in ("GET", "POST"):
+            raise ServiceError(405, f"Método não suportado: {method}")
+
+        jurisdiction = str(params.get("jurisdiction", DEFAULT_JURISDICTION))
+        if jurisdiction not in self.jurisdictions:
+            raise ServiceError(400, f"Jurisdição desconhecida: {jurisdiction}")
+        if url.path == "/validate":
+            return 200, await self.validate(_period_param(params), jurisdiction)
+        if url.path == "/adjust":
+            return 200, await self.adjust(_period_param(params), jurisdiction)
+        if url.path == "/plan":
+            return 200, await self.best_plan(
+                _int_param(params, "year", None, MIN_YEAR, MAX_YEAR),
+                _int_param(params, "budget", 30, 0, MAX_BUDGET),
+                _int_param(params, "max_fractions", MAX_FRACTIONS, 1, MAX_FRACTIONS),
+                _int_param(params, "top_k", 3, 1, MAX_TOP_K),
+                jurisdiction)
+        if url.path == "/stats":
+            return 200, json.dumps(self.stats()).encode("utf-8")
+        raise ServiceError(404, f"Endpoint desconhecido: {url.path}")
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """HTTP/1.1 mínimo: uma requisição por conexão"""
+        try:
+            try:
+                try:
+                    request_line = (await reader.readline()).decode("latin-1").strip()
+                    method, target, _ = request_line.split(" ", 2)
+                    headers = {}
+                    while True:
+                        line = (await reader.readline()).decode("latin-1").strip()
+                        if not line:
+                            break
+                        name, _, value = line.partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                    length = int(headers.get("content-length", 0))
+                    if length > MAX_BODY_SIZE:
+                        raise ServiceError(413, "Corpo da requisição grande demais")
+                    body = await reader.readexactly(length) if length else b""
+                except (ValueError, asyncio.IncompleteReadError):
+                    raise ServiceError(400, "Requisição HTTP malformada")
+                status, payload = await self.dispatch(method.upper(), target, body)
+            except ServiceError as exc:
+                status, payload = exc.status, json.dumps({"error": str(exc)}, ensure_ascii=False).encode("utf-8")
+            except Exception:
+                # O detalhe vai para o stderr do servidor, não para a resposta
+                traceback.print_exc()
+                status, payload = 500, json.dumps({"error": "Erro interno do servidor"},
+                                                  ensure_ascii=False).encode("utf-8")
+
+            writer.write(
+                f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: close\r\n\r\n".encode("latin-1") + payload
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for store in (self._store, self._executor_store):
+            if store is not None:
+                store.close()
+
+
+async def request(host: str, port: int, path: str, params: Optional[Dict[str, Any]] = None) -> Tuple[int, Any]:
+    """Cliente mínimo: envia params como corpo JSON (POST) e retorna (status, resposta)"""
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(params or {}).encode("utf-8")
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        f"Connection: close\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    return status, json.loads(payload)
+
+
+async def _demo(service: OptimizerService, burst: int):
+    """Simula a rajada de requisições idênticas do portal antes do prazo de marcação"""
+    server = await service.serve("127.0.0.1", 0)
+    host, port = server.sockets[0].getsockname()[:2]
+    async with server:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(
+            request(host, port, "/plan", {"year": 2025, "budget": 30}) for _ in range(burst)
+        ))
+        elapsed = time.perf_counter() - start
+        print(f"{burst} requisições /plan idênticas em {elapsed * 1000:.1f} ms")
+        print(f"Melhor plano: {responses[0][1]['plans'][0]}")
+
+        status, validation = await request(host, port, "/validate", {"start": "2025-04-14", "end": "2025-04-25"})
+        print(f"/validate ({status}): válido={validation['valid']}, feriados={len(validation['holidays'])}")
+        status, adjusted = await request(host, port, "/adjust", {"start": "2025-04-14", "end": "2025-04-25"})
+        print(f"/adjust ({status}): {adjusted['adjusted']}")
+
+        _, stats = await request(host, port, "/stats")
+        print(f"Estatísticas: {stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço HTTP do otimizador de férias")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="1 usa uma thread; mais que 1 usa um pool de processos")
+    parser.add_argument("--calendar-store", help="arquivo de calendários pré-computados")
+    parser.add_argument("--demo", type=int, metavar="N",
+                        help="em vez de servir, dispara N requisições idênticas com o cliente embutido")
+    args = parser.parse_args()
+
+    service = OptimizerService(args.workers, args.calendar_store)
+    try:
+        if args.demo:
+            asyncio.run(_demo(service, args.demo))
+        else:
+            async def serve_forever():
+                server = await service.serve(args.host, args.port)
+                print(f"Servindo em http://{args.host}:{args.port}")
+                async with server:
+                    await server.serve_forever()
+            asyncio.run(serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
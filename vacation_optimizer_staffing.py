@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Controle de Lotação Mínima
+--------------------------
+Índice dos períodos de férias já aprovados de uma unidade judiciária. Responde
+"quem está fora nestes dias" em O((k + 1) log n) e verifica se uma proposta (ou um
+roster inteiro, por varredura) deixa a unidade abaixo da lotação mínima.
+"""
+
+import bisect
+from datetime import date
+from typing import List, Tuple, Optional, Iterable, Iterator
+
+from vacation_optimizer_test import DateRange, first_at_least, sparse_max_table
+
+# Período aprovado: (ordinal do início, ordinal do fim, servidor)
+Absence = Tuple[int, int, str]
+
+
+def _runs_below(events: List[Tuple[int, int]], headcount: int, minimum_present: int,
+                last: Optional[int] = None) -> List[Tuple[DateRange, int]]:
+    """
+    Varredura dos eventos (ordinal, +1/-1) ordenados: trechos contíguos em que
+    headcount - ausentes < minimum_present, com a menor presença de cada trecho.
+    Trechos são cortados em `last` quando informado. Todo trecho termina num
+    evento de retorno, pois StaffingIndex exige minimum_present <= headcount.
+    """
+    runs: List[Tuple[DateRange, int]] = []
+    out = 0
+    run_start = None
+    run_present = 0
+    i = 0
+    while i < len(events):
+        ordinal = events[i][0]
+        while i < len(events) and events[i][0] == ordinal:
+            out += events[i][1]
+            i += 1
+        present = headcount - out
+        if present < minimum_present:
+            if run_start is None:
+                run_start, run_present = ordinal, present
+            else:
+                run_present = min(run_present, present)
+        elif run_start is not None:
+            end = ordinal - 1 if last is None else min(ordinal - 1, last)
+            runs.append((DateRange.from_ordinals(run_start, end), run_present))
+            run_start = None
+    return runs
+
+
+class StaffingIndex:
+    """
+    Períodos aprovados ordenados pelo início, com uma tabela esparsa do maior fim
+    (a mesma usada por FreeWindowIndex). Os períodos que cruzam [a, b] são os que
+    começam até b e terminam a partir de a: a busca binária limita o início e a
+    tabela salta direto para o próximo período que ainda termina a partir de a,
+    cada salto em O(log n). Períodos do mesmo servidor não devem se sobrepor.
+    """
+
+    def __init__(self, headcount: int, minimum_present: int,
+                 approved: Iterable[Tuple[str, DateRange]] = ()):
+        # Com headcount abaixo do mínimo todo dia estaria em falta, inclusive sem ausências
+        if not 0 <= minimum_present <= headcount:
+            raise ValueError(f"Lotação mínima {minimum_present} incompatível com {headcount} servidores")
+        self.headcount = headcount
+        self.minimum_present = minimum_present
+        self._absences: List[Absence] = []
+        # Colunas e tabela de máximos reconstruídas sob demanda após alterações
+        self._starts: Optional[List[int]] = None
+        self._ends: List[int] = []
+        self._max_ends: List[List[int]] = []
+        self.add_many(approved)
+
+    def __len__(self) -> int:
+        return len(self._absences)
+
+    def add(self, employee: str, period: DateRange):
+        bisect.insort(self._absences, (period.start_ordinal, period.end_ordinal, employee))
+        self._starts = None
+
+    def add_many(self, approved: Iterable[Tuple[str, DateRange]]):
+        """Adiciona vários períodos, reordenando uma única vez"""
+        size = len(self._absences)
+        self._absences.extend((period.start_ordinal, period.end_ordinal, employee)
+                              for employee, period in approved)
+        if len(self._absences) != size:
+            self._absences.sort()
+            self._starts = None
+
+    def remove(self, employee: str, period: DateRange) -> bool:
+        """Remove um período aprovado; retorna False se ele não estava no índice"""
+        absence = (period.start_ordinal, period.end_ordinal, employee)
+        position = bisect.bisect_left(self._absences, absence)
+        if position == len(self._absences) or self._absences[position] != absence:
+            return False
+        del self._absences[position]
+        self._starts = None
+        return True
+
+    def _index(self) -> Tuple[List[int], List[int], List[List[int]]]:
+        if self._starts is None:
+            self._starts = [absence[0] for absence in self._absences]
+            self._ends = [absence[1] for absence in self._absences]
+            self._max_ends = sparse_max_table(self._ends) if self._ends else [[]]
+        return self._starts, self._ends, self._max_ends
+
+    def _overlapping(self, start: int, end: int) -> Iterator[Absence]:
+        starts, _, table = self._index()
+        hi = bisect.bisect_right(starts, end)
+        position = first_at_least(table, 0, start)
+        while position < hi:
+            yield self._absences[position]
+            position = first_at_least(table, position + 1, start)
+
+    def who_is_out(self, period: DateRange) -> List[Tuple[str, DateRange]]:
+        """Servidores com férias aprovadas em algum dia do período, com o período aprovado"""
+        return [(employee, DateRange.from_ordinals(start, end))
+                for start, end, employee in self._overlapping(period.start_ordinal, period.end_ordinal)]
+
+    def absence_counts(self, period: DateRange, exclude: Optional[str] = None) -> List[int]:
+        """Quantidade de ausentes em cada dia do período (sem contar `exclude`)"""
+        first = period.start_ordinal
+        last = period.end_ordinal
+        delta = [0] * (last - first + 2)
+        for start, end, employee in self._overlapping(first, last):
+            if employee != exclude:
+                delta[max(start, first) - first] += 1
+                delta[min(end, last) - first + 1] -= 1
+        counts = []
+        out = 0
+        for change in delta[:-1]:
+            out += change
+            counts.append(out)
+        return counts
+
+    def shortages(self, employee: str, period: DateRange) -> List[Tuple[DateRange, int]]:
+        """
+        Trechos do período em que aprovar a proposta do servidor deixaria a
+        unidade abaixo da lotação mínima, com a presença resultante em cada um
+        """
+        first = period.start_ordinal
+        last = period.end_ordinal
+        events = []
+        for start, end, other in self._overlapping(first, last):
+            if other != employee:
+                events.append((max(start, first), 1))
+                events.append((min(end, last) + 1, -1))
+        events.append((first, 1))
+        events.append((last + 1, -1))
+        events.sort()
+        return _runs_below(events, self.headcount, self.minimum_present, last)
+
+    def breaks_floor(self, employee: str, period: DateRange) -> bool:
+        return bool(self.shortages(employee, period))
+
+    def check_roster(self, proposals: Iterable[Tuple[str, DateRange]] = ()) -> List[Tuple[DateRange, int]]:
+        """
+        Varredura única sobre todos os períodos aprovados mais as propostas:
+        trechos abaixo da lotação mínima no roster inteiro, em O((n + m) log(n + m))
+        """
+        events = []
+        for start, end, _ in self._absences:
+            events.append((start, 1))
+            events.append((end + 1, -1))
+        for _, period in proposals:
+            events.append((period.start_ordinal, 1))
+            events.append((period.end_ordinal + 1, -1))
+        events.sort()
+        return _runs_below(events, self.headcount, self.minimum_present)
+
+
+def main():
+    """Exemplo: unidade de 6 servidores que precisa de pelo menos 4 presentes"""
+    index = StaffingIndex(headcount=6, minimum_present=4, approved=[
+        ("Ana", DateRange(date(2025, 1, 7), date(2025, 1, 20))),
+        ("Bruno", DateRange(date(2025, 1, 13), date(2025, 1, 31))),
+        ("Carla", DateRange(date(2025, 2, 3), date(2025, 2, 14))),
+    ])
+
+    period = DateRange(date(2025, 1, 15), date(2025, 1, 24))
+    print(f"Ausentes em {period}:")
+    for employee, approved in index.who_is_out(period):
+        print(f"  - {employee}: {approved}")
+
+    for employee, proposal in (("Diego", DateRange(date(2025, 1, 14), date(2025, 1, 23))),
+                               ("Diego", DateRange(date(2025, 2, 3), date(2025, 2, 12)))):
+        shortages = index.shortages(employee, proposal)
+        if shortages:
+            print(f"Proposta de {employee} ({proposal}) viola a lotação mínima em:")
+            for run, present in shortages:
+                print(f"  - {run}: {present} presentes")
+        else:
+            print(f"Proposta de {employee} ({proposal}) respeita a lotação mínima")
+
+    roster = [("Diego", DateRange(date(2025, 1, 14), date(2025, 1, 23))),
+              ("Elisa", DateRange(date(2025, 2, 10), date(2025, 2, 21)))]
+    print(f"Trechos abaixo do mínimo no roster: {[(str(r), p) for r, p in index.check_roster(roster)]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Arquivo de Calendários Pré-computados
+-------------------------------------
+Serializa calendários de feriados de vários anos/jurisdições num arquivo
+binário compacto: a classificação dos dias do ano, as somas prefixadas por
+tipo e os feriados (ordinais, nomes e tipos). Processos workers abrem o
+arquivo com mmap e usam os arrays diretamente, sem copiá-los e sem
+reconstruir os calendários com load_holidays.
+
+Formato (little-endian):
+    cabeçalho   magic, versão, quantidade de entradas, offset da tabela de textos
+    entradas    uma por (ano, jurisdição), com os offsets dos blocos abaixo
+    blocos      tipos dos dias (uint8), somas prefixadas (int32, uma linha por
+                tipo de dia), ordinais (int32), nomes e tipos (uint32, índices
+                na tabela de textos) dos feriados; alinhados a 4 bytes
+    textos      quantidade, seguida de (tamanho uint16, UTF-8) para cada texto
+"""
+
+import argparse
+import mmap
+import struct
+import sys
+from array import array
+from datetime import date
+from typing import List, Dict, Tuple, Iterable
+
+from vacation_optimizer_test import (
+    DAY_TYPE_NAMES, DEFAULT_JURISDICTION, Holiday, HolidayCalendar, VacationOptimizer,
+    YearCalendar, build_holiday_calendar
+)
+
+STORE_MAGIC = b"VOCALSTO"
+STORE_VERSION = 1
+
+_HEADER = struct.Struct("<8sHHII")
+# ano, jurisdição (texto), dias, offset dos tipos, offset das somas, feriados, offset dos feriados
+_ENTRY = struct.Struct("<iIIIIII")
+_TEXT_LENGTH = struct.Struct("<H")
+
+
+def _aligned(buffer: bytearray):
+    buffer.extend(b"\0" * (-len(buffer) % 4))
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def save_calendar_store(path: str, calendars: Iterable[HolidayCalendar]) -> int:
+    """
+    Grava os calendários no arquivo e retorna a quantidade de entradas. A
+    classificação dos dias de cada ano considera todos os feriados da mesma
+    jurisdição presentes no arquivo (o recesso de dezembro vem do ano seguinte).
+    """
+    calendars = sorted(calendars, key=lambda c: (c.jurisdiction, c.year))
+
+    # Mesmo critério do VacationOptimizer: o primeiro feriado carregado na data prevalece
+    indexes: Dict[str, Dict[int, Holiday]] = {}
+    for calendar in calendars:
+        index = indexes.setdefault(calendar.jurisdiction, {})
+        for holiday in calendar.holidays:
+            index.setdefault(holiday.date.toordinal(), holiday)
+
+    texts: Dict[str, int] = {}
+
+    def text_id(value: str) -> int:
+        return texts.setdefault(value, len(texts))
+
+    base = _HEADER.size + _ENTRY.size * len(calendars)
+    body = bytearray()
+    entries = []
+    for calendar in calendars:
+        year_calendar = YearCalendar(calendar.year, indexes[calendar.jurisdiction])
+        days = len(year_calendar.day_types)
+
+        day_types_offset = base + len(body)
+        body.extend(year_calendar.day_types)
+        _aligned(body)
+
+        prefix_offset = base + len(body)
+        for sums in year_calendar.prefix:
+            body.extend(_little_endian(sums))
+
+        holidays_offset = base + len(body)
+        body.extend(_little_endian(array('i', calendar.ordinals)))
+        body.extend(_little_endian(array('I', [text_id(h.name) for h in calendar.holidays])))
+        body.extend(_little_endian(array('I', [text_id(h.type) for h in calendar.holidays])))
+
+        entries.append(_ENTRY.pack(calendar.year, text_id(calendar.jurisdiction), days,
+                                   day_types_offset, prefix_offset, len(calendar.holidays),
+                                   holidays_offset))
+
+    texts_offset = base + len(body)
+    body.extend(struct.pack("<I", len(texts)))
+    for value in texts:
+        encoded = value.encode("utf-8")
+        body.extend(_TEXT_LENGTH.pack(len(encoded)))
+        body.extend(encoded)
+
+    with open(path, "wb") as output:
+        output.write(_HEADER.pack(STORE_MAGIC, STORE_VERSION, 0, len(entries), texts_offset))
+        output.write(b"".join(entries))
+        output.write(body)
+    return len(entries)
+
+
+class CalendarStore:
+    """
+    Leitura de um arquivo gravado por save_calendar_store via mmap. Os
+    YearCalendar retornados apontam direto para o arquivo mapeado (sem cópia),
+    então o arquivo deve continuar aberto enquanto eles estiverem em uso.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+
+        magic, version, _, count, texts_offset = _HEADER.unpack_from(self._map, 0)
+        if magic != STORE_MAGIC or version != STORE_VERSION:
+            self.close()
+            raise ValueError(f"Arquivo de calendários inválido ou de versão incompatível: {path}")
+
+        self._texts: List[str] = []
+        (text_count,) = struct.unpack_from("<I", self._map, texts_offset)
+        position = texts_offset + 4
+        for _ in range(text_count):
+            (length,) = _TEXT_LENGTH.unpack_from(self._map, position)
+            position += _TEXT_LENGTH.size
+            self._texts.append(bytes(self._view[position:position + length]).decode("utf-8"))
+            position += length
+
+        self._entries: Dict[Tuple[int, str], Tuple[int, ...]] = {}
+        for i in range(count):
+            year, jurisdiction, *layout = _ENTRY.unpack_from(self._map, _HEADER.size + i * _ENTRY.size)
+            self._entries[(year, self._texts[jurisdiction])] = tuple(layout)
+
+        self._calendars: Dict[Tuple[int, str], HolidayCalendar] = {}
+
+    def _int_array(self, offset: int, count: int, typecode: str):
+        """Array de 32 bits do arquivo: sem cópia em máquinas little-endian"""
+        raw = self._view[offset:offset + 4 * count]
+        if sys.byteorder == "little":
+            return raw.cast(typecode)
+        values = array(typecode, raw)
+        values.byteswap()
+        return values
+
+    def keys(self) -> List[Tuple[int, str]]:
+        return sorted(self._entries)
+
+    def __contains__(self, key: Tuple[int, str]) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def year_calendar(self, year: int, jurisdiction: str = DEFAULT_JURISDICTION) -> YearCalendar:
+        """Classificação dos dias e somas prefixadas do ano, lidas do arquivo mapeado"""
+        days, day_types_offset, prefix_offset, _, _ = self._entries[(year, jurisdiction)]
+        day_types = self._view[day_types_offset:day_types_offset + days]
+        row = days + 1
+        prefix = [self._int_array(prefix_offset + 4 * row * day_type, row, 'i')
+                  for day_type in range(len(DAY_TYPE_NAMES))]
+        return YearCalendar.from_arrays(year, day_types, prefix)
+
+    def calendar(self, year: int, jurisdiction: str = DEFAULT_JURISDICTION) -> HolidayCalendar:
+        """Calendário de feriados do ano, materializado na primeira consulta"""
+        key = (year, jurisdiction)
+        calendar = self._calendars.get(key)
+        if calendar is None:
+            _, _, _, count, offset = self._entries[key]
+            ordinals = self._int_array(offset, count, 'i')
+            names = self._int_array(offset + 4 * count, count, 'I')
+            types = self._int_array(offset + 8 * count, count, 'I')
+            texts = self._texts
+            calendar = HolidayCalendar(year, jurisdiction, [
+                Holiday.from_date(date.fromordinal(ordinal), texts[name], texts[holiday_type])
+                for ordinal, name, holiday_type in zip(ordinals, names, types)
+            ])
+            self._calendars[key] = calendar
+        return calendar
+
+    def calendar_or_build(self, year: int, jurisdiction: str = DEFAULT_JURISDICTION) -> HolidayCalendar:
+        """Builder para CalendarCache: usa o arquivo e, se o ano não estiver nele, constrói"""
+        if (year, jurisdiction) in self._entries:
+            return self.calendar(year, jurisdiction)
+        return build_holiday_calendar(year, jurisdiction)
+
+    def load_into(self, optimizer: VacationOptimizer, jurisdiction: str = DEFAULT_JURISDICTION):
+        """
+        Carrega no otimizador todos os calendários da jurisdição. Num otimizador
+        ainda vazio os YearCalendar do arquivo são adotados sem recálculo, pois
+        refletem exatamente o mesmo conjunto de feriados.
+        """
+        fresh = not optimizer.holidays
+        keys = [key for key in self.keys() if key[1] == jurisdiction]
+        for year, _ in keys:
+            optimizer.load_calendar(self.calendar(year, jurisdiction))
+        if fresh:
+            for year, _ in keys:
+                optimizer.adopt_year_calendar(self.year_calendar(year, jurisdiction))
+
+    def close(self):
+        self._calendars.clear()
+        self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            # Ainda há YearCalendar apontando para o mapa; ele é fechado quando forem liberados
+            pass
+        self._file.close()
+
+    def __enter__(self) -> 'CalendarStore':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arquivo de calendários pré-computados")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="gera o arquivo a partir dos calendários padrão")
+    build.add_argument("path")
+    build.add_argument("--years", type=int, nargs=2, default=[2024, 2030], metavar=("INICIO", "FIM"))
+    build.add_argument("--jurisdictions", nargs="+", default=[DEFAULT_JURISDICTION])
+
+    info = subparsers.add_parser("info", help="lista o conteúdo de um arquivo")
+    info.add_argument("path")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        first, last = args.years
+        calendars = [build_holiday_calendar(year, jurisdiction)
+                     for jurisdiction in args.jurisdictions
+                     for year in range(first, last + 1)]
+        count = save_calendar_store(args.path, calendars)
+        print(f"{count} calendários gravados em {args.path}")
+    else:
+        with CalendarStore(args.path) as store:
+            for year, jurisdiction in store.keys():
+                print(store.calendar(year, jurisdiction))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,54 +6,186 @@ Este script testa a eficácia das correções propostas para o problema
 de inclusão de feriados em períodos de férias recomendados.
 """
 
+import bisect
+import cProfile
+import csv
 import datetime
+import heapq
+import io
+import json
+import os
+import pstats
 import uuid
+import weakref
 import random
+import time
+import tracemalloc
+from array import array
 from datetime import date, datetime, timedelta
-from typing import List, Dict, Any, Tuple, Optional, Set
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from operator import attrgetter, itemgetter
+from collections import OrderedDict
+from itertools import islice
+from typing import List, Dict, Any, Tuple, Optional, Set, Sequence, Callable, Iterable, Iterator, TextIO
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: sem ela a validação em lote usa bisect
+    np = None
+
+
+def parse_holiday_date(value: str) -> date:
+    """Converte uma data de feriado: caminho rápido ISO (AAAA-MM-DD), senão AAAAMMDD ou DD/MM/AAAA"""
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        # Antes do Python 3.11, fromisoformat não aceita o formato básico AAAAMMDD (usado no iCalendar)
+        for date_format in ("%Y-%m-%d", "%Y%m%d", "%d/%m/%Y"):
+            try:
+                return datetime.strptime(value, date_format).date()
+            except ValueError:
+                continue
+        raise ValueError(f"Data de feriado inválida: {value!r}")
 
 
 class Holiday:
+    __slots__ = ("date", "name", "type")
+    
     def __init__(self, date_str: str, name: str, holiday_type: str = "national"):
-        self.date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        self.date = parse_holiday_date(date_str)
         self.name = name
         self.type = holiday_type
     
+    @classmethod
+    def from_date(cls, holiday_date: date, name: str, holiday_type: str = "national") -> 'Holiday':
+        """Cria um feriado a partir de um date já convertido, sem passar por texto"""
+        holiday = cls.__new__(cls)
+        holiday.date = holiday_date
+        holiday.name = name
+        holiday.type = holiday_type
+        return holiday
+    
     def __str__(self):
         return f"{self.date.strftime('%Y-%m-%d')} - {self.name} ({self.type})"
 
 
 class DateRange:
+    """
+    Intervalo fechado de datas guardado como ordinais inteiros. As datas das
+    pontas são criadas só quando acessadas; iteração, tamanho, pertinência e as
+    operações de conjunto (interseção, união, diferença) são aritmética sobre os
+    ordinais, sem criar um objeto date por dia.
+    """
+    __slots__ = ("start_ordinal", "end_ordinal")
+    
     def __init__(self, start_date: date, end_date: date):
-        self.start_date = start_date
-        self.end_date = end_date
+        self.start_ordinal = start_date.toordinal()
+        self.end_ordinal = end_date.toordinal()
+    
+    @classmethod
+    def from_ordinals(cls, start_ordinal: int, end_ordinal: int) -> 'DateRange':
+        period = cls.__new__(cls)
+        period.start_ordinal = start_ordinal
+        period.end_ordinal = end_ordinal
+        return period
+    
+    @property
+    def start_date(self) -> date:
+        return date.fromordinal(self.start_ordinal)
+    
+    @property
+    def end_date(self) -> date:
+        return date.fromordinal(self.end_ordinal)
     
     def __str__(self):
         return f"{self.start_date.strftime('%d/%m/%Y')} a {self.end_date.strftime('%d/%m/%Y')}"
     
+    def __repr__(self):
+        return f"DateRange({self.start_date!r}, {self.end_date!r})"
+    
+    def __eq__(self, other):
+        if not isinstance(other, DateRange):
+            return NotImplemented
+        return self.start_ordinal == other.start_ordinal and self.end_ordinal == other.end_ordinal
+    
+    def __hash__(self):
+        return hash((self.start_ordinal, self.end_ordinal))
+    
+    def __len__(self) -> int:
+        return max(self.end_ordinal - self.start_ordinal + 1, 0)
+    
+    def __contains__(self, item) -> bool:
+        """Aceita uma data ou um ordinal"""
+        ordinal = item if isinstance(item, int) else item.toordinal()
+        return self.start_ordinal <= ordinal <= self.end_ordinal
+    
+    def __iter__(self) -> Iterator[date]:
+        """Datas do intervalo, geradas sob demanda"""
+        return map(date.fromordinal, self.ordinals())
+    
+    def ordinals(self) -> range:
+        return range(self.start_ordinal, self.end_ordinal + 1)
+    
     def contains_date(self, check_date: date) -> bool:
-        return self.start_date <= check_date <= self.end_date
+        return self.start_ordinal <= check_date.toordinal() <= self.end_ordinal
     
     def duration_days(self) -> int:
-        return (self.end_date - self.start_date).days + 1
+        return self.end_ordinal - self.start_ordinal + 1
     
     def overlaps_with(self, other: 'DateRange') -> bool:
-        return (self.start_date <= other.end_date and self.end_date >= other.start_date)
+        return self.start_ordinal <= other.end_ordinal and self.end_ordinal >= other.start_ordinal
     
     def day_list(self) -> List[date]:
         """Retorna uma lista com todas as datas no intervalo"""
-        days = []
-        current = self.start_date
-        while current <= self.end_date:
-            days.append(current)
-            current += timedelta(days=1)
-        return days
+        return list(self)
+    
+    def intersection(self, other: 'DateRange') -> Optional['DateRange']:
+        """Dias comuns aos dois intervalos (None se não se sobrepõem)"""
+        start = max(self.start_ordinal, other.start_ordinal)
+        end = min(self.end_ordinal, other.end_ordinal)
+        return DateRange.from_ordinals(start, end) if start <= end else None
+    
+    def union(self, *others: 'DateRange') -> List['DateRange']:
+        """União com outros intervalos, como intervalos disjuntos e ordenados"""
+        return merge_date_ranges((self,) + others)
+    
+    def difference(self, *others: 'DateRange') -> List['DateRange']:
+        """Dias do intervalo fora de todos os outros, como intervalos disjuntos e ordenados"""
+        pieces = []
+        start = self.start_ordinal
+        for other in merge_date_ranges(others):
+            if other.end_ordinal < start:
+                continue
+            if other.start_ordinal > self.end_ordinal:
+                break
+            if other.start_ordinal > start:
+                pieces.append(DateRange.from_ordinals(start, other.start_ordinal - 1))
+            start = other.end_ordinal + 1
+        if start <= self.end_ordinal:
+            pieces.append(DateRange.from_ordinals(start, self.end_ordinal))
+        return pieces
+
+
+def merge_date_ranges(ranges: Iterable[DateRange]) -> List[DateRange]:
+    """Une intervalos que se sobrepõem ou se tocam; o total de dias é a soma dos len()"""
+    merged: List[DateRange] = []
+    for period in sorted(ranges, key=attrgetter("start_ordinal")):
+        if merged and period.start_ordinal <= merged[-1].end_ordinal + 1:
+            if period.end_ordinal > merged[-1].end_ordinal:
+                merged[-1] = DateRange.from_ordinals(merged[-1].start_ordinal, period.end_ordinal)
+        else:
+            merged.append(DateRange.from_ordinals(period.start_ordinal, period.end_ordinal))
+    return merged
 
 
 class Recommendation:
+    __slots__ = ("_id", "title", "description", "date_range", "efficiency_gain",
+                 "days_changed", "strategic_score", "__weakref__")
+    
     def __init__(self, title: str, description: str, date_range: DateRange, 
                  efficiency_gain: float, days_changed: int, strategic_score: float = 0.0):
-        self.id = str(uuid.uuid4())
+        self._id = None
         self.title = title
         self.description = description
         self.date_range = date_range
@@ -61,104 +193,1680 @@ class Recommendation:
         self.days_changed = days_changed
         self.strategic_score = strategic_score
     
+    @property
+    def id(self) -> str:
+        """Identificador gerado apenas no primeiro acesso"""
+        if self._id is None:
+            self._id = str(uuid.uuid4())
+        return self._id
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "title": self.title,
+            "description": self.description,
+            "start_date": self.date_range.start_date.isoformat(),
+            "end_date": self.date_range.end_date.isoformat(),
+            "efficiency_gain": self.efficiency_gain,
+            "days_changed": self.days_changed,
+            "strategic_score": self.strategic_score,
+        }
+    
     def __str__(self):
         return f"{self.title}: {self.date_range} (score: {self.strategic_score:.2f})"
 
 
-class VacationOptimizer:
+def stream_jsonl(recommendations: Iterable[Recommendation], output: TextIO) -> int:
+    """Escreve cada recomendação como uma linha JSON assim que é produzida"""
+    written = 0
+    for rec in recommendations:
+        output.write(json.dumps(rec.to_dict(), ensure_ascii=False))
+        output.write("\n")
+        written += 1
+    return written
+
+
+class RecommendationSet:
+    """
+    Recomendações armazenadas em colunas (struct-of-arrays): ordinais de início e
+    fim, ganhos e pontuações em `array`, para gerar e manter milhões de candidatos
+    sem criar um objeto por recomendação. Os objetos Recommendation são criados
+    apenas quando acessados; o conjunto guarda só referências fracas a eles, então
+    o mesmo índice devolve o mesmo objeto enquanto alguém o usa e nada fica retido
+    depois disso.
+    """
+    
     def __init__(self):
-        self.holidays = []
-        self.recommendations = []
+        self.starts = array('i')
+        self.ends = array('i')
+        self.efficiency_gains = array('d')
+        self.strategic_scores = array('d')
+        self.days_changed = array('i')
+        self.titles: List[str] = []
+        self.descriptions: List[str] = []
+        self._materialized: "weakref.WeakValueDictionary[int, Recommendation]" = weakref.WeakValueDictionary()
     
-    def load_holidays(self, year: int):
-        """Carrega feriados para o ano especificado"""
-        # Feriados nacionais fixos
-        national_holidays = [
-            (f"{year}-01-01", "Confraternização Universal"),
-            (f"{year}-04-21", "Tiradentes"),
-            (f"{year}-05-01", "Dia do Trabalho"),
-            (f"{year}-09-07", "Independência"),
-            (f"{year}-10-12", "Nossa Senhora Aparecida"),
-            (f"{year}-11-02", "Finados"),
-            (f"{year}-11-15", "Proclamação da República"),
-            (f"{year}-12-25", "Natal")
-        ]
+    @classmethod
+    def from_recommendations(cls, recommendations: List[Recommendation]) -> 'RecommendationSet':
+        result = cls()
+        for rec in recommendations:
+            result.append(rec.title, rec.description, rec.date_range.start_ordinal,
+                          rec.date_range.end_ordinal, rec.efficiency_gain,
+                          rec.days_changed, rec.strategic_score)
+        return result
+    
+    def append(self, title: str, description: str, start_ordinal: int, end_ordinal: int,
+               efficiency_gain: float, days_changed: int, strategic_score: float = 0.0):
+        self.starts.append(start_ordinal)
+        self.ends.append(end_ordinal)
+        self.efficiency_gains.append(efficiency_gain)
+        self.days_changed.append(days_changed)
+        self.strategic_scores.append(strategic_score)
+        self.titles.append(title)
+        self.descriptions.append(description)
+    
+    def __len__(self) -> int:
+        return len(self.starts)
+    
+    def _build(self, index: int) -> Recommendation:
+        return Recommendation(
+            self.titles[index],
+            self.descriptions[index],
+            DateRange.from_ordinals(self.starts[index], self.ends[index]),
+            self.efficiency_gains[index],
+            self.days_changed[index],
+            self.strategic_scores[index]
+        )
+    
+    def __getitem__(self, index: int) -> Recommendation:
+        if index < 0:
+            index += len(self)
+        rec = self._materialized.get(index)
+        if rec is None:
+            rec = self._build(index)
+            self._materialized[index] = rec
+        return rec
+    
+    def __iter__(self):
+        """Objetos novos a cada passagem (sem registrá-los), salvo os que ainda estão em uso"""
+        materialized = self._materialized
+        for index in range(len(self)):
+            rec = materialized.get(index)
+            yield rec if rec is not None else self._build(index)
+    
+    def select(self, keep: Sequence[bool]) -> 'RecommendationSet':
+        """Retorna um novo conjunto apenas com as linhas marcadas em `keep`"""
+        result = RecommendationSet()
+        for index, kept in enumerate(keep):
+            if kept:
+                result.append(self.titles[index], self.descriptions[index], self.starts[index],
+                              self.ends[index], self.efficiency_gains[index],
+                              self.days_changed[index], self.strategic_scores[index])
+        return result
+    
+    def top(self, k: int) -> List[Recommendation]:
+        """As k recomendações de maior pontuação estratégica"""
+        scores = self.strategic_scores
+        best = heapq.nlargest(k, range(len(self)), key=scores.__getitem__)
+        return [self[index] for index in best]
+
+
+# Tipos de dia usados na classificação pré-computada do calendário
+DAY_WORKDAY = 0
+DAY_WEEKEND = 1
+DAY_NATIONAL = 2
+DAY_JUDICIAL = 3
+DAY_RECESS = 4
+DAY_TYPE_NAMES = ("workday", "weekend", "national", "judicial", "recess")
+
+# Feriados municipais (e tipos desconhecidos) são tratados como feriados nacionais
+HOLIDAY_DAY_TYPES = {"national": DAY_NATIONAL, "municipal": DAY_NATIONAL,
+                     "judicial": DAY_JUDICIAL, "recess": DAY_RECESS}
+
+
+# Jurisdição padrão (apenas feriados nacionais, judiciais e recesso)
+DEFAULT_JURISDICTION = "federal"
+
+# Feriados municipais por jurisdição, como "MM-DD" (cópia de src/utils/municipalHolidaysData.ts)
+JURISDICTION_HOLIDAY_TEMPLATES: Dict[str, List[Tuple[str, str]]] = {
+    "Rio de Janeiro": [
+        ("01-20", "Dia de São Sebastião"),
+        ("04-23", "Dia de São Jorge"),
+        ("11-20", "Dia da Consciência Negra"),
+    ],
+    "Niterói": [
+        ("05-22", "Aniversário de Niterói"),
+        ("11-22", "Dia de Santa Cecília"),
+        ("11-20", "Dia da Consciência Negra"),
+    ],
+    "Angra dos Reis": [
+        ("01-06", "Dia de Reis (Aniversário de Angra)"),
+        ("11-20", "Dia da Consciência Negra"),
+    ],
+    "São Gonçalo": [
+        ("09-22", "Aniversário de São Gonçalo"),
+        ("11-20", "Dia da Consciência Negra"),
+    ],
+    "Duque de Caxias": [
+        ("08-25", "Aniversário de Duque de Caxias"),
+        ("11-20", "Dia da Consciência Negra"),
+        ("06-13", "Dia de Santo Antônio"),
+    ],
+    "Nova Iguaçu": [
+        ("01-15", "Aniversário da Cidade - Ponto Facultativo (Nova Iguaçu)"),
+        ("11-20", "Dia da Consciência Negra"),
+        ("06-13", "Dia de Santo Antônio"),
+    ],
+    "São João de Meriti": [
+        ("04-19", "Aniversário de São João de Meriti"),
+        ("11-20", "Dia da Consciência Negra"),
+        ("06-24", "Dia de São João"),
+    ],
+    "Petrópolis": [
+        ("03-16", "Aniversário de Petrópolis"),
+        ("11-20", "Dia da Consciência Negra"),
+    ],
+    "Volta Redonda": [
+        ("07-17", "Aniversário da Cidade - Volta Redonda"),
+        ("11-20", "Dia da Consciência Negra"),
+        ("06-13", "Dia de Santo Antônio"),
+    ],
+    "Campos dos Goytacazes": [
+        ("05-28", "Aniversário de Campos dos Goytacazes"),
+        ("10-28", "Dia de São Judas Tadeu"),
+        ("11-20", "Dia da Consciência Negra"),
+        ("01-15", "Dia de Santo Amaro"),
+        ("08-06", "Dia de São Salvador"),
+    ],
+    "Macaé": [
+        ("07-29", "Aniversário da Cidade - Macaé"),
+        ("11-20", "Dia da Consciência Negra"),
+        ("06-24", "Dia de São João"),
+    ],
+    "Cabo Frio": [
+        ("11-13", "Aniversário de Cabo Frio"),
+        ("11-20", "Dia da Consciência Negra"),
+    ],
+    "Nova Friburgo": [
+        ("05-16", "Aniversário da Cidade - Nova Friburgo"),
+        ("11-20", "Dia da Consciência Negra"),
+    ],
+    "Teresópolis": [
+        ("07-06", "Aniversário de Teresópolis"),
+        ("11-20", "Dia da Consciência Negra"),
+        ("06-13", "Dia de Santo Antônio"),
+        ("10-15", "Dia de Santa Teresa"),
+    ],
+    "Vitória": [
+        ("09-08", "Dia de Nossa Senhora da Vitória"),
+        ("11-20", "Dia da Consciência Negra"),
+    ],
+    "Vila Velha": [
+        ("05-23", "Aniversário de Vila Velha"),
+        ("11-20", "Dia da Consciência Negra"),
+    ],
+    "Cachoeiro de Itapemirim": [
+        ("06-29", "Aniversário de Cachoeiro de Itapemirim"),
+        ("11-20", "Dia da Consciência Negra"),
+    ],
+    "Itaperuna": [
+        ("05-10", "Aniversário da Cidade - Itaperuna"),
+        ("03-19", "Dia de São José"),
+    ],
+    "Itaboraí": [
+        ("05-22", "Aniversário da Cidade - Itaboraí"),
+        ("06-24", "Dia de São João"),
+    ],
+    "Magé": [
+        ("06-09", "Aniversário da Cidade - Magé"),
+        ("09-15", "Dia de Nossa Senhora da Piedade"),
+    ],
+    "Resende": [
+        ("09-29", "Aniversário da Cidade - Resende"),
+    ],
+    "São Pedro da Aldeia": [
+        ("05-16", "Aniversário da Cidade - São Pedro da Aldeia"),
+    ],
+    "Barra do Piraí": [
+        ("03-10", "Aniversário da Cidade"),
+    ],
+    "Três Rios": [
+        ("01-20", "Dia de São Sebastião"),
+    ],
+    # Municípios sem feriados próprios no aplicativo recebem apenas o padrão
+    "Araruama": [
+        ("11-20", "Dia da Consciência Negra"),
+    ],
+    "Armação dos Búzios": [
+        ("11-20", "Dia da Consciência Negra"),
+    ],
+    "Barra Mansa": [
+        ("11-20", "Dia da Consciência Negra"),
+    ],
+}
+
+# Eventos que ocorrem uma única vez, com a data completa
+JURISDICTION_SPECIFIC_EVENTS: Dict[str, List[Tuple[str, str]]] = {
+    "São Gonçalo": [
+        ("2025-02-25", "Evento de inauguração das novas instalações da Subseção Judiciária de São Gonçalo"),
+    ],
+    "Rio de Janeiro": [
+        ("2025-02-28", "Sexta-feira de Carnaval (apenas na Capital)"),
+    ],
+}
+
+KNOWN_JURISDICTIONS = frozenset([DEFAULT_JURISDICTION, *JURISDICTION_HOLIDAY_TEMPLATES])
+
+# Feriados móveis como deslocamento em dias a partir do Domingo de Páscoa
+EASTER_HOLIDAY_OFFSETS = (
+    (-48, "Carnaval", "national"),
+    (-47, "Carnaval", "national"),
+    (-46, "Quarta-feira de Cinzas", "judicial"),
+    (-2, "Sexta-feira Santa", "national"),
+    (60, "Corpus Christi", "national"),
+)
+
+# Quantidade máxima de calendários (ano, jurisdição) mantidos em cache
+CALENDAR_CACHE_SIZE = 64
+
+# Tamanho dos blocos validados de uma vez pelo pipeline em geradores
+PIPELINE_CHUNK_SIZE = 1024
+
+# Regras de fracionamento das férias (frações de no mínimo 5 dias, até 3 frações)
+MIN_FRACTION_DAYS = 5
+MAX_FRACTIONS = 3
+
+# Dias examinados antes e depois do ano ao estender um bloco de folga
+OFF_RUN_MARGIN = 60
+
+
+class PeriodStats:
+    def __init__(self, counts: List[int]):
+        self.counts = counts
+    
+    @property
+    def workdays(self) -> int:
+        return self.counts[DAY_WORKDAY]
+    
+    @property
+    def weekends(self) -> int:
+        return self.counts[DAY_WEEKEND]
+    
+    @property
+    def holidays(self) -> int:
+        return self.counts[DAY_NATIONAL] + self.counts[DAY_JUDICIAL] + self.counts[DAY_RECESS]
+    
+    @property
+    def duration(self) -> int:
+        return sum(self.counts)
+    
+    def __str__(self):
+        return f"{self.workdays} dias úteis, {self.weekends} fins de semana, {self.holidays} feriados"
+
+
+class YearCalendar:
+    """
+    Classificação pré-computada dos dias de um ano (útil, fim de semana, feriado
+    nacional, judicial ou recesso), com somas prefixadas por tipo para que a
+    contagem de qualquer intervalo dentro do ano seja O(1).
+    """
+    
+    def __init__(self, year: int, holiday_index: Dict[int, Holiday]):
+        self.year = year
+        self.first_ordinal = date(year, 1, 1).toordinal()
+        self.last_ordinal = date(year, 12, 31).toordinal()
+        size = self.last_ordinal - self.first_ordinal + 1
         
-        # Adicionar alguns feriados móveis baseados em regras simplificadas
-        # Carnaval (exemplo simplificado: sempre em fevereiro)
-        carnaval1 = date(year, 2, random.randint(10, 26))
-        carnaval2 = carnaval1 + timedelta(days=1)
+        # Um feriado prevalece sobre o fim de semana, como em print_period_details
+        self.day_types = bytearray(size)
+        first_weekday = date(year, 1, 1).weekday()
+        for i in range(size):
+            holiday = holiday_index.get(self.first_ordinal + i)
+            if holiday is not None:
+                self.day_types[i] = HOLIDAY_DAY_TYPES.get(holiday.type, DAY_NATIONAL)
+            elif (first_weekday + i) % 7 >= 5:
+                self.day_types[i] = DAY_WEEKEND
         
-        # Sexta-feira Santa (exemplo simplificado: sempre em março ou abril)
-        sexta_santa = date(year, random.choice([3, 4]), random.randint(10, 28))
+        # prefix[t][i] = quantidade de dias do tipo t nos i primeiros dias do ano
+        self.prefix = []
+        for day_type in range(len(DAY_TYPE_NAMES)):
+            sums = array('i', [0]) * (size + 1)
+            total = 0
+            for i, current_type in enumerate(self.day_types):
+                if current_type == day_type:
+                    total += 1
+                sums[i + 1] = total
+            self.prefix.append(sums)
+    
+    @classmethod
+    def from_arrays(cls, year: int, day_types: Sequence[int], prefix: List[Sequence[int]]) -> 'YearCalendar':
+        """Reaproveita arrays já calculados (por exemplo, mapeados de um arquivo) sem recalcular"""
+        calendar = cls.__new__(cls)
+        calendar.year = year
+        calendar.first_ordinal = date(year, 1, 1).toordinal()
+        calendar.last_ordinal = date(year, 12, 31).toordinal()
+        calendar.day_types = day_types
+        calendar.prefix = prefix
+        return calendar
+    
+    def day_type(self, check_date: date) -> int:
+        """Retorna o tipo de uma data do ano"""
+        return self.day_types[check_date.toordinal() - self.first_ordinal]
+    
+    def counts(self, start_ordinal: int, end_ordinal: int) -> List[int]:
+        """Conta os dias de cada tipo no intervalo (limitado ao ano), em O(1)"""
+        lo = max(start_ordinal, self.first_ordinal) - self.first_ordinal
+        hi = min(end_ordinal, self.last_ordinal) - self.first_ordinal + 1
+        if lo >= hi:
+            return [0] * len(DAY_TYPE_NAMES)
+        return [sums[hi] - sums[lo] for sums in self.prefix]
+
+    def update_days(self, changes: Dict[int, int]):
+        """
+        Aplica novos tipos a alguns dias (ordinal -> tipo) e corrige as somas
+        prefixadas só dos tipos envolvidos, a partir do primeiro dia alterado
+        """
+        if not isinstance(self.day_types, bytearray):
+            # Arrays mapeados de arquivo são somente leitura: copia antes de alterar
+            self.day_types = bytearray(self.day_types)
+            self.prefix = [array('i', sums) for sums in self.prefix]
+
+        touched = set()
+        for ordinal, day_type in changes.items():
+            i = ordinal - self.first_ordinal
+            if self.day_types[i] != day_type:
+                touched.update((self.day_types[i], day_type))
+                self.day_types[i] = day_type
+        if not touched:
+            return
+
+        lo = min(changes) - self.first_ordinal
+        for day_type in touched:
+            sums = self.prefix[day_type]
+            total = sums[lo]
+            for i in range(lo, len(self.day_types)):
+                if self.day_types[i] == day_type:
+                    total += 1
+                sums[i + 1] = total
+
+
+def _forward_weekday(ordinal: int) -> int:
+    """Avança um ordinal de sábado/domingo para a segunda-feira seguinte"""
+    weekday = (ordinal - 1) % 7
+    return ordinal + (7 - weekday if weekday >= 5 else 0)
+
+
+def _backward_weekday(ordinal: int) -> int:
+    """Recua um ordinal de sábado/domingo para a sexta-feira anterior"""
+    weekday = (ordinal - 1) % 7
+    return ordinal - (weekday - 4 if weekday >= 5 else 0)
+
+
+def sparse_max_table(values: List[int]) -> List[List[int]]:
+    """Tabela esparsa de máximos: o nível k guarda o máximo de cada trecho de 2**k valores"""
+    table = [values]
+    step = 1
+    while 2 * step <= len(values):
+        previous = table[-1]
+        table.append([max(previous[i], previous[i + step]) for i in range(len(values) - 2 * step + 1)])
+        step *= 2
+    return table
+
+
+def first_at_least(table: List[List[int]], lo: int, minimum: int) -> int:
+    """Primeiro índice >= lo com valor >= minimum (len se não houver), em O(log n)"""
+    size = len(table[0])
+    position = lo
+    for level in range(len(table) - 1, -1, -1):
+        if position + (1 << level) <= size and table[level][position] < minimum:
+            position += 1 << level
+    return position
+
+
+def last_at_least(table: List[List[int]], hi: int, minimum: int) -> int:
+    """Último índice <= hi com valor >= minimum (-1 se não houver), em O(log n)"""
+    position = hi + 1
+    for level in range(len(table) - 1, -1, -1):
+        if position - (1 << level) >= 0 and table[level][position - (1 << level)] < minimum:
+            position -= 1 << level
+    return position - 1
+
+
+class FreeWindowIndex:
+    """
+    Índice das lacunas sem feriado entre feriados consecutivos. Encontra a
+    janela sem feriados de d dias, começando em dia útil, mais próxima de uma
+    data em qualquer direção, sem varrer os dias do período. As lacunas ficam
+    em blocos de até 2 * CHUNK com o máximo de cada bloco, de modo que incluir
+    ou liberar um dia (forbid/allow) ajusta só as lacunas vizinhas em O(√n).
+    """
+    
+    CHUNK = 64
+    
+    def __init__(self, holiday_ordinals: List[int]):
+        # Lacuna j vai do dia seguinte ao feriado j-1 até a véspera do feriado j;
+        # a primeira e a última lacunas são ilimitadas. Lacunas vazias (feriados
+        # consecutivos) não são guardadas
+        starts = [date.min.toordinal()] + [o + 1 for o in holiday_ordinals]
+        ends = [o - 1 for o in holiday_ordinals] + [date.max.toordinal()]
+        gaps = [(start, end) for start, end in zip(starts, ends) if start <= end]
         
-        # Corpus Christi (exemplo simplificado: sempre em maio ou junho)
-        corpus_christi = date(year, random.choice([5, 6]), random.randint(10, 28))
+        # Por bloco: inícios, fins, maior duração que cabe em cada lacuna
+        # começando em seu primeiro dia útil (cap) e tamanho bruto (size)
+        self._starts: List[List[int]] = []
+        self._ends: List[List[int]] = []
+        self._caps: List[List[int]] = []
+        self._sizes: List[List[int]] = []
+        self._firsts: List[int] = []
+        self._max_caps: List[int] = []
+        self._max_sizes: List[int] = []
+        for i in range(0, len(gaps), self.CHUNK):
+            chunk = gaps[i:i + self.CHUNK]
+            self._starts.append([start for start, _ in chunk])
+            self._ends.append([end for _, end in chunk])
+            self._caps.append([])
+            self._sizes.append([])
+            self._firsts.append(0)
+            self._max_caps.append(0)
+            self._max_sizes.append(0)
+            self._refresh(len(self._starts) - 1)
+    
+    def _refresh(self, c: int):
+        """Recalcula cap, size e os máximos do bloco c"""
+        starts, ends = self._starts[c], self._ends[c]
+        self._caps[c] = [end - _forward_weekday(start) + 1 for start, end in zip(starts, ends)]
+        self._sizes[c] = [end - start + 1 for start, end in zip(starts, ends)]
+        self._firsts[c] = starts[0]
+        self._max_caps[c] = max(self._caps[c])
+        self._max_sizes[c] = max(self._sizes[c])
+    
+    def _locate(self, ordinal: int) -> Tuple[int, int]:
+        """Bloco e posição da última lacuna que começa em ou antes de ordinal ((0, -1) se nenhuma)"""
+        c = bisect.bisect_right(self._firsts, ordinal) - 1
+        if c < 0:
+            return 0, -1
+        return c, bisect.bisect_right(self._starts[c], ordinal) - 1
+    
+    def _insert(self, c: int, i: int, start: int, end: int):
+        """Insere a lacuna [start, end] na posição i do bloco c, dividindo-o se crescer demais"""
+        self._starts[c].insert(i, start)
+        self._ends[c].insert(i, end)
+        if len(self._starts[c]) > 2 * self.CHUNK:
+            half = self.CHUNK
+            for lists in (self._starts, self._ends, self._caps, self._sizes):
+                lists.insert(c + 1, [])
+            self._starts[c + 1] = self._starts[c][half:]
+            self._ends[c + 1] = self._ends[c][half:]
+            del self._starts[c][half:], self._ends[c][half:]
+            self._firsts.insert(c + 1, 0)
+            self._max_caps.insert(c + 1, 0)
+            self._max_sizes.insert(c + 1, 0)
+            self._refresh(c + 1)
+        self._refresh(c)
+    
+    def _delete(self, c: int, i: int):
+        """Remove a lacuna i do bloco c, descartando o bloco se ficar vazio"""
+        del self._starts[c][i], self._ends[c][i]
+        if self._starts[c]:
+            self._refresh(c)
+            return
+        for lists in (self._starts, self._ends, self._caps, self._sizes,
+                      self._firsts, self._max_caps, self._max_sizes):
+            del lists[c]
+    
+    def forbid(self, ordinal: int):
+        """Marca um dia livre como proibido, dividindo a lacuna que o contém"""
+        c, i = self._locate(ordinal)
+        start, end = self._starts[c][i], self._ends[c][i]
+        if start == end:
+            self._delete(c, i)
+        elif ordinal == start:
+            self._starts[c][i] = ordinal + 1
+            self._refresh(c)
+        elif ordinal == end:
+            self._ends[c][i] = ordinal - 1
+            self._refresh(c)
+        else:
+            self._ends[c][i] = ordinal - 1
+            self._insert(c, i + 1, ordinal + 1, end)
+    
+    def allow(self, ordinal: int):
+        """Libera um dia proibido, unindo as lacunas vizinhas"""
+        c, i = self._locate(ordinal)
+        joins_left = i >= 0 and self._ends[c][i] == ordinal - 1
+        if i + 1 < len(self._starts[c]):
+            right = (c, i + 1)
+        elif c + 1 < len(self._starts):
+            right = (c + 1, 0)
+        else:
+            right = None
+        joins_right = right is not None and self._starts[right[0]][right[1]] == ordinal + 1
+        
+        if joins_left and joins_right:
+            self._ends[c][i] = self._ends[right[0]][right[1]]
+            self._delete(*right)
+            self._refresh(c)
+        elif joins_left:
+            self._ends[c][i] = ordinal
+            self._refresh(c)
+        elif joins_right:
+            self._starts[right[0]][right[1]] = ordinal
+            self._refresh(right[0])
+        else:
+            self._insert(c, i + 1, ordinal, ordinal)
+    
+    def _next_at_least(self, c: int, i: int, minimum: int) -> Optional[Tuple[int, int]]:
+        """Primeira lacuna a partir de (c, i) com cap >= minimum"""
+        while c < len(self._starts):
+            if self._max_caps[c] >= minimum:
+                caps = self._caps[c]
+                for j in range(i, len(caps)):
+                    if caps[j] >= minimum:
+                        return c, j
+            c, i = c + 1, 0
+        return None
+    
+    def _previous_at_least(self, c: int, i: int, minimum: int) -> Optional[Tuple[int, int]]:
+        """Última lacuna até (c, i) com size >= minimum"""
+        while c >= 0:
+            if self._max_sizes[c] >= minimum:
+                sizes = self._sizes[c]
+                for j in range(min(i, len(sizes) - 1), -1, -1):
+                    if sizes[j] >= minimum:
+                        return c, j
+            c, i = c - 1, len(self._starts[c - 1]) - 1 if c > 0 else -1
+        return None
+    
+    def next_window(self, start_ordinal: int, length: int) -> Optional[int]:
+        """Menor início >= start_ordinal de uma janela válida de `length` dias"""
+        c, i = self._locate(start_ordinal)
+        if i >= 0 and self._ends[c][i] >= start_ordinal:
+            start = _forward_weekday(start_ordinal)
+            if start + length - 1 <= self._ends[c][i]:
+                return start
         
-        mobile_holidays = [
-            (carnaval1.strftime("%Y-%m-%d"), "Carnaval"),
-            (carnaval2.strftime("%Y-%m-%d"), "Carnaval"),
-            (sexta_santa.strftime("%Y-%m-%d"), "Sexta-feira Santa"),
-            (corpus_christi.strftime("%Y-%m-%d"), "Corpus Christi")
+        found = self._next_at_least(c, i + 1, length)
+        if found is None:
+            return None
+        return _forward_weekday(self._starts[found[0]][found[1]])
+    
+    def previous_window(self, start_ordinal: int, length: int) -> Optional[int]:
+        """Maior início <= start_ordinal de uma janela válida de `length` dias"""
+        c, i = self._locate(start_ordinal)
+        if i < 0:
+            return None
+        latest = min(start_ordinal, self._ends[c][i] - length + 1)
+        found: Optional[Tuple[int, int]] = (c, i)
+        while found is not None:
+            c, i = found
+            start = _backward_weekday(latest)
+            if start >= self._starts[c][i]:
+                return start
+            # Lacunas menores que a janela nunca servem; as que sobram falham no
+            # máximo por causa do fim de semana e são descartadas uma a uma
+            found = self._previous_at_least(c, i - 1, length)
+            if found is not None:
+                latest = self._ends[found[0]][found[1]] - length + 1
+        return None
+
+
+class HolidayCalendar:
+    """Conjunto imutável e pré-processado dos feriados de um ano em uma jurisdição"""
+    
+    def __init__(self, year: int, jurisdiction: str, holidays: List[Holiday]):
+        self.year = year
+        self.jurisdiction = jurisdiction
+        self.holidays: Tuple[Holiday, ...] = tuple(sorted(holidays, key=lambda h: h.date))
+        self.ordinals: Tuple[int, ...] = tuple(h.date.toordinal() for h in self.holidays)
+    
+    def __len__(self) -> int:
+        return len(self.holidays)
+    
+    def __str__(self):
+        return f"Calendário {self.year} ({self.jurisdiction}): {len(self.holidays)} feriados"
+
+
+def plan_efficiency(days_spent: int, days_off: int) -> float:
+    """Dias de folga por dia de férias gasto; plano vazio (nenhuma fração cabe nas regras) rende 0"""
+    return days_off / days_spent if days_spent else 0.0
+
+
+class VacationPlan:
+    def __init__(self, fractions: List[DateRange], blocks: List[DateRange]):
+        self.fractions = fractions
+        # Bloco contínuo de folga criado por cada fração (com fins de semana e feriados adjacentes)
+        self.blocks = blocks
+    
+    @property
+    def days_spent(self) -> int:
+        return sum(fraction.duration_days() for fraction in self.fractions)
+    
+    @property
+    def days_off(self) -> int:
+        return sum(block.duration_days() for block in self.blocks)
+    
+    @property
+    def efficiency(self) -> float:
+        return plan_efficiency(self.days_spent, self.days_off)
+    
+    def __str__(self):
+        fractions = " + ".join(str(fraction) for fraction in self.fractions)
+        return f"{fractions} ({self.days_off} dias de folga, eficiência {self.efficiency:.2f})"
+
+
+@lru_cache(maxsize=None)
+def easter_sunday(year: int) -> date:
+    """Domingo de Páscoa pelo algoritmo gregoriano anônimo (Meeus/Jones/Butcher)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+@lru_cache(maxsize=None)
+def mobile_holidays_for_year(year: int) -> Tuple[Tuple[date, str, str], ...]:
+    """Feriados móveis do ano (data, nome, tipo), calculados a partir da Páscoa"""
+    easter = easter_sunday(year)
+    return tuple((easter + timedelta(days=offset), name, h_type)
+                 for offset, name, h_type in EASTER_HOLIDAY_OFFSETS)
+
+
+def precompute_mobile_holidays(first_year: int, last_year: int) -> Dict[int, Tuple[Tuple[date, str, str], ...]]:
+    """Calcula (e memoriza) os feriados móveis de um intervalo de anos de uma vez"""
+    return {year: mobile_holidays_for_year(year) for year in range(first_year, last_year + 1)}
+
+
+def build_holiday_calendar(year: int, jurisdiction: str = DEFAULT_JURISDICTION) -> HolidayCalendar:
+    """Monta o calendário de feriados de um ano para uma jurisdição"""
+    if jurisdiction not in KNOWN_JURISDICTIONS:
+        raise ValueError(f"Jurisdição desconhecida: {jurisdiction!r}")
+    
+    # Feriados nacionais fixos
+    national_holidays = [
+        (f"{year}-01-01", "Confraternização Universal"),
+        (f"{year}-04-21", "Tiradentes"),
+        (f"{year}-05-01", "Dia do Trabalho"),
+        (f"{year}-09-07", "Independência"),
+        (f"{year}-10-12", "Nossa Senhora Aparecida"),
+        (f"{year}-11-02", "Finados"),
+        (f"{year}-11-15", "Proclamação da República"),
+        (f"{year}-12-25", "Natal")
+    ]
+    
+    # Feriados móveis derivados da Páscoa
+    mobile_holidays = [(h_date.strftime("%Y-%m-%d"), name, h_type)
+                       for h_date, name, h_type in mobile_holidays_for_year(year)]
+    
+    # Feriados judiciais
+    judicial_holidays = [
+        (f"{year}-01-31", "Dia da Justiça Federal", "judicial"),
+        (f"{year}-08-11", "Dia do Advogado", "judicial"),
+        (f"{year}-10-31", "Dia do Servidor Público", "judicial"),
+        (f"{year}-12-08", "Dia da Justiça", "judicial")
+    ]
+    
+    # Recesso judicial
+    recess_dates = []
+    for day in range(20, 32):  # 20 a 31 de dezembro
+        recess_dates.append((f"{year-1}-12-{day:02d}", "Recesso Forense", "recess"))
+    
+    for day in range(1, 7):    # 1 a 6 de janeiro
+        recess_dates.append((f"{year}-01-{day:02d}", "Recesso Forense", "recess"))
+    
+    # Feriados municipais da jurisdição (a federal não tem) e eventos do ano
+    municipal_holidays = [(f"{year}-{month_day}", name, "municipal")
+                          for month_day, name in JURISDICTION_HOLIDAY_TEMPLATES.get(jurisdiction, [])]
+    municipal_holidays += [(event_date, name, "municipal")
+                           for event_date, name in JURISDICTION_SPECIFIC_EVENTS.get(jurisdiction, [])
+                           if event_date.startswith(f"{year}-")]
+    
+    holidays = [Holiday(date_str, name, "national") for date_str, name in national_holidays]
+    holidays += [Holiday(date_str, name, h_type)
+                 for date_str, name, h_type in mobile_holidays + judicial_holidays + recess_dates + municipal_holidays]
+    return HolidayCalendar(year, jurisdiction, holidays)
+
+
+def _read_holidays_csv(stream: TextIO, default_type: str,
+                       jurisdiction: Optional[str]) -> Iterator[Holiday]:
+    """CSV com cabeçalho: date, name e, opcionalmente, type e jurisdiction"""
+    for row in csv.DictReader(stream):
+        if jurisdiction is not None and row.get("jurisdiction") not in (None, "", jurisdiction):
+            continue
+        yield Holiday.from_date(parse_holiday_date(row["date"].strip()), row["name"].strip(),
+                                (row.get("type") or default_type).strip())
+
+
+def _read_holidays_json(stream: TextIO, default_type: str,
+                        jurisdiction: Optional[str]) -> Iterator[Holiday]:
+    """Lista de objetos {date, name, type?, jurisdiction?} ou {"holidays": [...]}"""
+    data = json.load(stream)
+    if isinstance(data, dict):
+        data = data["holidays"]
+    for item in data:
+        if jurisdiction is not None and item.get("jurisdiction") not in (None, "", jurisdiction):
+            continue
+        yield Holiday.from_date(parse_holiday_date(item["date"]), item["name"],
+                                item.get("type") or default_type)
+
+
+def _read_holidays_ics(stream: TextIO, default_type: str,
+                       jurisdiction: Optional[str]) -> Iterator[Holiday]:
+    """
+    Eventos VEVENT de um iCalendar: DTSTART/DTEND (DTEND exclusivo, um feriado
+    por dia), SUMMARY como nome e CATEGORIES, se for um tipo conhecido, como tipo
+    """
+    # Desfazer as linhas dobradas (continuações começam com espaço ou tab)
+    lines: List[str] = []
+    for raw_line in stream:
+        line = raw_line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and lines:
+            lines[-1] += line[1:]
+        else:
+            lines.append(line)
+    
+    event: Optional[Dict[str, str]] = None
+    for line in lines:
+        if line == "BEGIN:VEVENT":
+            event = {}
+        elif line == "END:VEVENT" and event is not None:
+            if "DTSTART" in event:
+                start = parse_holiday_date(event["DTSTART"][:8])
+                end = parse_holiday_date(event["DTEND"][:8]) if "DTEND" in event else start + timedelta(days=1)
+                category = event.get("CATEGORIES", "").split(",")[0].strip().lower()
+                holiday_type = category if category in HOLIDAY_DAY_TYPES else default_type
+                name = event.get("SUMMARY", "").replace("\\,", ",").replace("\\;", ";")
+                for offset in range(max((end - start).days, 1)):
+                    yield Holiday.from_date(start + timedelta(days=offset), name, holiday_type)
+            event = None
+        elif event is not None and ":" in line:
+            key, value = line.split(":", 1)
+            event[key.split(";", 1)[0].upper()] = value.strip()
+
+
+HOLIDAY_FILE_READERS: Dict[str, Callable[[TextIO, str, Optional[str]], Iterator[Holiday]]] = {
+    ".csv": _read_holidays_csv,
+    ".json": _read_holidays_json,
+    ".ics": _read_holidays_ics,
+}
+
+
+def read_holiday_file(path: str, default_type: str = "national",
+                      jurisdiction: Optional[str] = None) -> List[Holiday]:
+    """
+    Lê feriados de um arquivo CSV, JSON ou iCalendar (pela extensão). Se
+    `jurisdiction` for informada, linhas de outras jurisdições são ignoradas.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    reader = HOLIDAY_FILE_READERS.get(extension)
+    if reader is None:
+        raise ValueError(f"Formato de arquivo de feriados não suportado: {path}")
+    with open(path, encoding="utf-8", newline="") as stream:
+        return list(reader(stream, default_type, jurisdiction))
+
+
+class CalendarCache:
+    """
+    Cache LRU de calendários de feriados por (ano, jurisdição). Calendários são
+    imutáveis, então a mesma instância pode ser compartilhada entre otimizadores.
+    """
+    
+    def __init__(self, maxsize: int = CALENDAR_CACHE_SIZE,
+                 builder: Callable[[int, str], HolidayCalendar] = build_holiday_calendar):
+        self.maxsize = maxsize
+        self.builder = builder
+        self.hits = 0
+        self.misses = 0
+        self._calendars: "OrderedDict[Tuple[int, str], HolidayCalendar]" = OrderedDict()
+    
+    def get(self, year: int, jurisdiction: str = DEFAULT_JURISDICTION) -> HolidayCalendar:
+        """Retorna o calendário do cache, construindo-o (e descartando o menos usado) se preciso"""
+        key = (year, jurisdiction)
+        calendar = self._calendars.get(key)
+        if calendar is not None:
+            self.hits += 1
+            self._calendars.move_to_end(key)
+            return calendar
+        
+        self.misses += 1
+        calendar = self.builder(year, jurisdiction)
+        self._calendars[key] = calendar
+        if len(self._calendars) > self.maxsize:
+            self._calendars.popitem(last=False)
+        return calendar
+    
+    def put(self, calendar: HolidayCalendar):
+        """Insere um calendário já construído (por exemplo, carregado de outro processo)"""
+        key = (calendar.year, calendar.jurisdiction)
+        self._calendars[key] = calendar
+        self._calendars.move_to_end(key)
+        if len(self._calendars) > self.maxsize:
+            self._calendars.popitem(last=False)
+    
+    def clear(self):
+        self._calendars.clear()
+    
+    def __len__(self) -> int:
+        return len(self._calendars)
+    
+    def __contains__(self, key: Tuple[int, str]) -> bool:
+        return key in self._calendars
+
+
+# Cache compartilhado por padrão entre todos os otimizadores do processo
+_calendar_cache = CalendarCache()
+
+
+def _format_period_details(period: DateRange, title: str, stats: PeriodStats,
+                           holidays: List[Holiday]) -> str:
+    lines = [
+        f"\n{title}: {period}",
+        f"Duração: {stats.duration} dias",
+        f"Dias úteis: {stats.workdays}",
+        f"Fins de semana: {stats.weekends}",
+        f"Feriados: {stats.holidays}",
+    ]
+    if holidays:
+        lines.append("Lista de feriados no período:")
+        lines.extend(f"  - {h.date.strftime('%d/%m/%Y')} ({h.date.strftime('%a')}): {h.name}" for h in holidays)
+    return "\n".join(lines)
+
+
+class OptimizerRunResult:
+    """
+    Resultado estruturado de run_tests: contagens, recomendações válidas e tempos
+    por etapa. O relatório textual só é montado quando render() é chamado.
+    """
+    
+    def __init__(self, year: int):
+        self.year = year
+        self.holidays_loaded = 0
+        self.holidays_in_year = 0
+        self.problem_recommendations: List[Recommendation] = []
+        self.optimal_recommendations: List[Recommendation] = []
+        self.naive_fixed: List[Recommendation] = []
+        self.smart_fixed: List[Recommendation] = []
+        self.final_valid: List[Recommendation] = []
+        self.final_removed = 0
+        # (recomendação, quantidade de feriados) das recomendações problemáticas de cada etapa
+        self.problems: List[Tuple[Recommendation, int]] = []
+        self.optimal_problems: List[Tuple[Recommendation, int]] = []
+        self.naive_failures: List[Tuple[Recommendation, int]] = []
+        self.smart_failures: List[Tuple[Recommendation, int]] = []
+        self.examples: List[Tuple[Recommendation, PeriodStats, List[Holiday]]] = []
+        self.timings: Dict[str, float] = {}
+    
+    @property
+    def problematic_count(self) -> int:
+        return len(self.problems)
+    
+    @property
+    def smart_removed(self) -> int:
+        return len(self.problem_recommendations) - len(self.smart_fixed)
+    
+    @property
+    def smart_adjusted(self) -> int:
+        return self.problematic_count - self.smart_removed
+    
+    @property
+    def success(self) -> bool:
+        return not self.naive_failures and not self.smart_failures
+    
+    @property
+    def elapsed(self) -> float:
+        return sum(self.timings.values())
+    
+    def __bool__(self) -> bool:
+        return self.success
+    
+    def render(self) -> str:
+        """Monta o relatório completo do teste"""
+        problematic = self.problematic_count
+        naive_fixed_rate = 100 * (problematic - len(self.naive_failures)) / max(1, problematic)
+        smart_fixed_rate = 100 * (problematic - len(self.smart_failures)) / max(1, problematic)
+        lines = [
+            "\n" + "="*80,
+            f"TESTE DE ALGORITMO DE OTIMIZAÇÃO DE FÉRIAS - ANO: {self.year}",
+            "="*80,
+            f"Carregados {self.holidays_loaded} feriados para o ano {self.year}",
+            "\n1. Gerando recomendações problemáticas (que podem incluir feriados)",
+        ]
+        lines += [f"  - PROBLEMA: {rec.title} contém {count} feriado(s)" for rec, count in self.problems]
+        lines += [
+            f"Total de recomendações geradas: {len(self.problem_recommendations)}",
+            f"Recomendações com problemas: {problematic}",
+            "\n2. Gerando recomendações dos planos ótimos (já evitando feriados)",
+        ]
+        lines += [f"  - ERRO: {rec.title} contém {count} feriado(s) - ISTO NÃO DEVERIA ACONTECER"
+                  for rec, count in self.optimal_problems]
+        lines += [
+            f"Total de recomendações ótimas geradas: {len(self.optimal_recommendations)}",
+            f"Recomendações ótimas problemáticas: {len(self.optimal_problems)}",
+            "\n3. Aplicando correção ingênua (remover recomendações com feriados)",
+            f"Correção ingênua: {len(self.problem_recommendations) - len(self.naive_fixed)} "
+            f"recomendações problemáticas removidas",
         ]
+        lines += [f"  - FALHA: {rec.title} ainda contém {count} feriado(s)" for rec, count in self.naive_failures]
+        lines += [
+            f"Recomendações após correção ingênua: {len(self.naive_fixed)}",
+            f"Ainda problemáticas: {len(self.naive_failures)}",
+            "\n4. Aplicando correção inteligente (ajustar períodos para evitar feriados)",
+            f"Correção inteligente: {self.smart_adjusted} recomendações ajustadas, {self.smart_removed} removidas",
+        ]
+        lines += [f"  - FALHA: {rec.title} ainda contém {count} feriado(s)" for rec, count in self.smart_failures]
+        lines += [
+            f"Recomendações após correção inteligente: {len(self.smart_fixed)}",
+            f"Ainda problemáticas: {len(self.smart_failures)}",
+            "\n5. Teste de verificação final",
+            f"Total de recomendações: {len(self.final_valid) + self.final_removed}",
+            f"Recomendações válidas após verificação final: {len(self.final_valid)}",
+            f"Recomendações removidas: {self.final_removed}",
+            "\n" + "="*80,
+            "RESUMO DO TESTE",
+            "="*80,
+            f"Feriados no ano {self.year}: {self.holidays_in_year}",
+            f"Recomendações geradas com problemas potenciais: {len(self.problem_recommendations)}",
+            f"Problemas reais encontrados: {problematic}",
+            f"Eficácia da correção ingênua: {naive_fixed_rate:.1f}%",
+            f"Eficácia da correção inteligente: {smart_fixed_rate:.1f}%",
+            "Eficácia da verificação final: 100%",
+        ]
+        
+        # Mostrar exemplos de recomendações válidas
+        if self.examples:
+            lines.append("\nExemplos de recomendações válidas:")
+            for i, (rec, stats, holidays) in enumerate(self.examples):
+                lines.append(f"\nRecomendação {i+1}: {rec}")
+                lines.append(_format_period_details(rec.date_range, "Detalhes", stats, holidays))
         
-        # Feriados judiciais
-        judicial_holidays = [
-            (f"{year}-01-31", "Dia da Justiça Federal", "judicial"),
-            (f"{year}-08-11", "Dia do Advogado", "judicial"),
-            (f"{year}-10-31", "Dia do Servidor Público", "judicial"),
-            (f"{year}-12-08", "Dia da Justiça", "judicial")
+        lines += [
+            "\n" + "="*80,
+            "CONCLUSÃO",
+            "="*80,
+            "RESULTADO DO TESTE: " + ("SUCESSO" if self.success else "FALHA"),
+            "Todas as correções implementadas são eficazes? " + ("SIM" if self.success else "NÃO"),
+            f"Tempo de execução: {self.elapsed * 1000:.1f} ms",
         ]
+        return "\n".join(lines)
+    
+    def __str__(self):
+        status = "SUCESSO" if self.success else "FALHA"
+        return (f"Ano {self.year}: {status} ({self.problematic_count} problemas, "
+                f"{len(self.final_valid)} recomendações válidas, {self.elapsed * 1000:.1f} ms)")
+
+
+class OptimizerMetrics:
+    """Contagem de chamadas e tempo acumulado (inclusivo) por método instrumentado"""
+    
+    def __init__(self):
+        self.calls: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+    
+    def record(self, name: str, elapsed: float):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.seconds[name] = self.seconds.get(name, 0.0) + elapsed
+    
+    def reset(self):
+        self.calls.clear()
+        self.seconds.clear()
+    
+    def copy(self) -> 'OptimizerMetrics':
+        copied = OptimizerMetrics()
+        copied.calls = dict(self.calls)
+        copied.seconds = dict(self.seconds)
+        return copied
+    
+    def snapshot(self, since: Optional['OptimizerMetrics'] = None) -> Dict[str, Dict[str, float]]:
+        """Métricas acumuladas ou, com `since`, apenas o que foi registrado depois daquela cópia"""
+        result = {}
+        for name, calls in sorted(self.calls.items()):
+            seconds = self.seconds[name]
+            if since is not None:
+                calls -= since.calls.get(name, 0)
+                seconds -= since.seconds.get(name, 0.0)
+                if not calls:
+                    continue
+            result[name] = {"calls": calls, "total_seconds": seconds, "mean_seconds": seconds / calls}
+        return result
+
+
+class ProfileSession:
+    """Resultado de VacationOptimizer.profile(): métricas, cProfile e tracemalloc"""
+    
+    def __init__(self):
+        self.metrics: Dict[str, Dict[str, float]] = {}
+        self.stats: Optional[pstats.Stats] = None
+        self.memory_current = 0
+        self.memory_peak = 0
+        self.top_allocations: List[tracemalloc.Statistic] = []
+    
+    def render(self, limit: int = 15) -> str:
+        lines = ["Métricas por método:"]
+        for name, values in self.metrics.items():
+            lines.append(f"  - {name}: {values['calls']} chamadas, {values['total_seconds'] * 1000:.2f} ms")
+        if self.memory_peak:
+            lines.append(f"Memória: {self.memory_current / 1024:.1f} KiB ao final, pico de {self.memory_peak / 1024:.1f} KiB")
+            lines.extend(f"  - {stat}" for stat in self.top_allocations[:limit])
+        if self.stats is not None:
+            output = io.StringIO()
+            self.stats.stream = output
+            self.stats.sort_stats("cumulative").print_stats(limit)
+            lines.append(output.getvalue())
+        return "\n".join(lines)
+
+
+class VacationOptimizer:
+    # Métodos envolvidos por enable_instrumentation(); chamadas aninhadas entram
+    # no tempo do método externo também (tempo inclusivo)
+    INSTRUMENTED_METHODS = (
+        "is_holiday",
+        "period_contains_holiday",
+        "period_stats",
+        "validate_batch",
+        "find_nearest_window",
+        "find_optimal_plans",
+        "create_recommendations_with_problems",
+        "create_bridge_recommendations",
+        "apply_naive_fix",
+        "apply_smart_fix",
+        "run_tests",
+    )
+    
+    def __init__(self, calendar_cache: Optional[CalendarCache] = None):
+        self.holidays = []
+        self.recommendations = []
+        self.calendar_cache = calendar_cache if calendar_cache is not None else _calendar_cache
+        # Métricas da instrumentação opcional (ver enable_instrumentation)
+        self.metrics: Optional[OptimizerMetrics] = None
+        # Calendários (ano, jurisdição) já incorporados e chaves dos feriados já cadastrados
+        self._loaded_calendars: Set[Tuple[int, str]] = set()
+        self._holiday_keys: Set[Tuple[int, str, str]] = set()
+        # Índice de feriados por ordinal da data (o primeiro feriado cadastrado na data prevalece)
+        self._holiday_index: Dict[int, Holiday] = {}
+        # Ordinais ordenados das datas com feriado, para consultas por intervalo
+        self._holiday_ordinals: List[int] = []
+        # Calendários pré-computados por ano, atualizados dia a dia quando os feriados mudam
+        self._year_calendars: Dict[int, YearCalendar] = {}
+        # Cópia em NumPy dos ordinais proibidos, criada sob demanda para a validação em lote
+        self._holiday_ordinals_array = None
+        # Sequências de folga por ano e planos ótimos já calculados
+        self._off_runs: Dict[int, Tuple[List[int], List[int]]] = {}
+        self._plan_cache: Dict[Tuple[int, int, int, int, int], List[VacationPlan]] = {}
+        # Índice de janelas sem feriado usado pela correção inteligente
+        self._free_windows: Optional[FreeWindowIndex] = None
+        # Períodos bloqueados (início, fim) e quantos deles cobrem cada dia
+        self._blocked_periods: List[Tuple[int, int]] = []
+        self._blocked_days: Dict[int, int] = {}
+        # Ordinais ordenados dos dias proibidos para férias: feriados e dias bloqueados
+        self._forbidden_ordinals: List[int] = []
+        # Chamados com (primeiro, último ordinal) quando feriados ou bloqueios mudam
+        self._change_listeners: List[Callable[[int, int], None]] = []
+        # Versão do calendário (muda a cada alteração de dias) e pontuações já calculadas nela
+        self.calendar_version = 0
+        self._score_cache: Dict[Tuple[int, int, int], float] = {}
+    
+    def enable_instrumentation(self) -> OptimizerMetrics:
+        """
+        Passa a contar chamadas e tempo dos INSTRUMENTED_METHODS. Os wrappers ficam
+        como atributos da instância; desligada, a instrumentação não custa nada,
+        pois as chamadas voltam a ir direto aos métodos da classe.
+        """
+        if self.metrics is None:
+            self.metrics = OptimizerMetrics()
+        for name in self.INSTRUMENTED_METHODS:
+            if name not in self.__dict__:
+                setattr(self, name, self._instrumented(name, getattr(self, name)))
+        return self.metrics
+    
+    def disable_instrumentation(self):
+        """Remove os wrappers; as métricas acumuladas continuam disponíveis"""
+        for name in self.INSTRUMENTED_METHODS:
+            self.__dict__.pop(name, None)
+    
+    def _instrumented(self, name: str, method: Callable) -> Callable:
+        metrics = self.metrics
+        clock = time.perf_counter
         
-        # Recesso judicial
-        recess_dates = []
-        for day in range(20, 32):  # 20 a 31 de dezembro
-            recess_dates.append((f"{year-1}-12-{day:02d}", "Recesso Forense", "recess"))
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            started = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                metrics.record(name, clock() - started)
+        return wrapper
+    
+    def metrics_snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Cópia das métricas acumuladas (vazia se a instrumentação nunca foi ligada)"""
+        return self.metrics.snapshot() if self.metrics is not None else {}
+    
+    @contextmanager
+    def profile(self, cpu: bool = True, memory: bool = True) -> Iterator[ProfileSession]:
+        """
+        Liga instrumentação, cProfile e tracemalloc durante o bloco, por exemplo
+        em volta de run_tests; o ProfileSession é preenchido ao sair do bloco.
+        Contadores já ligados continuam acumulando: a sessão recebe só a diferença.
+        """
+        session = ProfileSession()
+        was_instrumented = "is_holiday" in self.__dict__
+        self.enable_instrumentation()
+        before = self.metrics.copy()
         
-        for day in range(1, 7):    # 1 a 6 de janeiro
-            recess_dates.append((f"{year}-01-{day:02d}", "Recesso Forense", "recess"))
+        profiler = cProfile.Profile() if cpu else None
+        started_tracing = memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield session
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                session.stats = pstats.Stats(profiler)
+            if memory and tracemalloc.is_tracing():
+                session.memory_current, session.memory_peak = tracemalloc.get_traced_memory()
+                session.top_allocations = tracemalloc.take_snapshot().statistics("lineno")
+                if started_tracing:
+                    tracemalloc.stop()
+            session.metrics = self.metrics.snapshot(since=before)
+            if not was_instrumented:
+                self.disable_instrumentation()
+    
+    def _day_type(self, ordinal: int) -> int:
+        holiday = self._holiday_index.get(ordinal)
+        if holiday is not None:
+            return HOLIDAY_DAY_TYPES.get(holiday.type, DAY_NATIONAL)
+        return DAY_WEEKEND if (ordinal - 1) % 7 >= 5 else DAY_WORKDAY
+    
+    def _forbid(self, ordinal: int):
+        """Inclui um dia em _forbidden_ordinals, ajustando só as lacunas vizinhas do índice de janelas"""
+        bisect.insort(self._forbidden_ordinals, ordinal)
+        if self._free_windows is not None:
+            self._free_windows.forbid(ordinal)
+    
+    def _allow(self, ordinal: int):
+        """Retira um dia de _forbidden_ordinals, unindo as lacunas vizinhas do índice de janelas"""
+        del self._forbidden_ordinals[bisect.bisect_left(self._forbidden_ordinals, ordinal)]
+        if self._free_windows is not None:
+            self._free_windows.allow(ordinal)
+    
+    def _calendar_days_changed(self, ordinals: Iterable[int], day_types_changed: bool = True):
+        """
+        Atualiza as estruturas derivadas apenas nos dias alterados (feriados ou
+        períodos bloqueados) e avisa os ouvintes, um aviso por trecho contíguo.
+        Pontuações e blocos de folga só dependem dos tipos de dia, então
+        mudanças em períodos bloqueados não os invalidam
+        """
+        ordinals = sorted(set(ordinals))
+        if not ordinals:
+            return
         
-        # Criar objetos Holiday e adicionar à lista
-        for date_str, name in national_holidays + mobile_holidays:
-            self.holidays.append(Holiday(date_str, name, "national"))
+        changes: Dict[int, Dict[int, int]] = {}
+        years = set()
+        for ordinal in ordinals:
+            year = date.fromordinal(ordinal).year
+            if day_types_changed and year in self._year_calendars:
+                changes.setdefault(year, {})[ordinal] = self._day_type(ordinal)
+            # Blocos de folga enxergam OFF_RUN_MARGIN dias além do ano, então os anos vizinhos também mudam
+            years.update((year - 1, year, year + 1))
+        for year, year_changes in changes.items():
+            self._year_calendars[year].update_days(year_changes)
         
-        for date_str, name, h_type in judicial_holidays:
-            self.holidays.append(Holiday(date_str, name, h_type))
+        self._holiday_ordinals_array = None
+        if day_types_changed:
+            self.calendar_version += 1
+            self._score_cache.clear()
+            for year in years:
+                self._off_runs.pop(year, None)
+        self._plan_cache = {key: plans for key, plans in self._plan_cache.items() if key[0] not in years}
         
-        for date_str, name, h_type in recess_dates:
-            self.holidays.append(Holiday(date_str, name, h_type))
+        if self._change_listeners:
+            first = previous = ordinals[0]
+            for ordinal in ordinals[1:] + [None]:
+                if ordinal is not None and ordinal == previous + 1:
+                    previous = ordinal
+                    continue
+                for listener in list(self._change_listeners):
+                    listener(first, previous)
+                if ordinal is not None:
+                    first = previous = ordinal
+    
+    def add_change_listener(self, listener: Callable[[int, int], None]):
+        """Registra quem deve ser avisado (primeiro e último ordinal) quando dias mudam"""
+        self._change_listeners.append(listener)
+    
+    def remove_change_listener(self, listener: Callable[[int, int], None]):
+        self._change_listeners.remove(listener)
+    
+    def add_holiday(self, holiday: Holiday):
+        """Adiciona um feriado mantendo os índices de consulta sincronizados"""
+        ordinal = holiday.date.toordinal()
+        key = (ordinal, holiday.name, holiday.type)
+        if key in self._holiday_keys:
+            return
+        self._holiday_keys.add(key)
+        self.holidays.append(holiday)
+        if ordinal not in self._holiday_index:
+            self._holiday_index[ordinal] = holiday
+            bisect.insort(self._holiday_ordinals, ordinal)
+            if ordinal not in self._blocked_days:
+                self._forbid(ordinal)
+            self._calendar_days_changed([ordinal])
+    
+    def add_holidays(self, holidays: List[Holiday]):
+        """Adiciona vários feriados de uma vez, reordenando o índice uma única vez"""
+        index = self._holiday_index
+        keys = self._holiday_keys
+        changed = []
+        for holiday in holidays:
+            ordinal = holiday.date.toordinal()
+            key = (ordinal, holiday.name, holiday.type)
+            if key in keys:
+                continue
+            keys.add(key)
+            self.holidays.append(holiday)
+            if ordinal not in index:
+                index[ordinal] = holiday
+                changed.append(ordinal)
+        if not changed:
+            return
+        self._holiday_ordinals = sorted(index)
+        forbidden = [ordinal for ordinal in changed if ordinal not in self._blocked_days]
+        self._forbidden_ordinals = (sorted(index.keys() | self._blocked_days.keys())
+                                    if self._blocked_days else list(self._holiday_ordinals))
+        # Poucos dias novos: ajusta as lacunas; numa carga grande, reconstruir é mais barato
+        if self._free_windows is not None:
+            if len(forbidden) * FreeWindowIndex.CHUNK > len(self._forbidden_ordinals):
+                self._free_windows = None
+            else:
+                for ordinal in forbidden:
+                    self._free_windows.forbid(ordinal)
+        self._calendar_days_changed(changed)
+    
+    def remove_holiday(self, holiday_date: date) -> List[Holiday]:
+        """Remove todos os feriados de uma data e retorna os feriados removidos"""
+        removed = [h for h in self.holidays if h.date == holiday_date]
+        if not removed:
+            return []
         
-        print(f"Carregados {len(self.holidays)} feriados para o ano {year}")
+        self.holidays = [h for h in self.holidays if h.date != holiday_date]
+        ordinal = holiday_date.toordinal()
+        self._holiday_keys.difference_update((ordinal, h.name, h.type) for h in removed)
+        del self._holiday_index[ordinal]
+        del self._holiday_ordinals[bisect.bisect_left(self._holiday_ordinals, ordinal)]
+        if ordinal not in self._blocked_days:
+            self._allow(ordinal)
+        self._calendar_days_changed([ordinal])
+        return removed
+    
+    def add_blocked_period(self, period: DateRange):
+        """
+        Bloqueia um período (por exemplo, férias já aprovadas de um colega): seus
+        dias passam a invalidar recomendações e ficam fora dos planos ótimos
+        """
+        bisect.insort(self._blocked_periods, (period.start_ordinal, period.end_ordinal))
+        blocked = self._blocked_days
+        for ordinal in period.ordinals():
+            count = blocked.get(ordinal, 0)
+            if count == 0 and ordinal not in self._holiday_index:
+                self._forbid(ordinal)
+            blocked[ordinal] = count + 1
+        self._calendar_days_changed(period.ordinals(), day_types_changed=False)
+    
+    def remove_blocked_period(self, period: DateRange) -> bool:
+        """Desfaz um add_blocked_period; retorna False se o período não estava bloqueado"""
+        first = period.start_ordinal
+        last = period.end_ordinal
+        position = bisect.bisect_left(self._blocked_periods, (first, last))
+        if position == len(self._blocked_periods) or self._blocked_periods[position] != (first, last):
+            return False
+        del self._blocked_periods[position]
+        blocked = self._blocked_days
+        for ordinal in period.ordinals():
+            count = blocked[ordinal] - 1
+            if count:
+                blocked[ordinal] = count
+                continue
+            del blocked[ordinal]
+            if ordinal not in self._holiday_index:
+                self._allow(ordinal)
+        self._calendar_days_changed(period.ordinals(), day_types_changed=False)
+        return True
+    
+    def is_blocked(self, check_date: date) -> bool:
+        return check_date.toordinal() in self._blocked_days
+    
+    def get_year_calendar(self, year: int) -> YearCalendar:
+        """Retorna o calendário pré-computado do ano, construindo-o uma única vez"""
+        calendar = self._year_calendars.get(year)
+        if calendar is None:
+            calendar = YearCalendar(year, self._holiday_index)
+            self._year_calendars[year] = calendar
+        return calendar
+    
+    def period_stats(self, period: DateRange) -> PeriodStats:
+        """Conta dias úteis, fins de semana e feriados de um período em O(1) por ano abrangido"""
+        start_ordinal = period.start_ordinal
+        end_ordinal = period.end_ordinal
+        counts = [0] * len(DAY_TYPE_NAMES)
+        for year in range(period.start_date.year, period.end_date.year + 1):
+            year_counts = self.get_year_calendar(year).counts(start_ordinal, end_ordinal)
+            for day_type, count in enumerate(year_counts):
+                counts[day_type] += count
+        return PeriodStats(counts)
+    
+    def load_holidays(self, year: int, jurisdiction: str = DEFAULT_JURISDICTION):
+        """Carrega feriados para o ano especificado (uma única vez por ano/jurisdição)"""
+        if (year, jurisdiction) in self._loaded_calendars:
+            return
+        self.load_calendar(self.calendar_cache.get(year, jurisdiction))
+    
+    def load_holiday_files(self, paths: Iterable[str], default_type: str = "national",
+                           jurisdiction: Optional[str] = None) -> int:
+        """
+        Carrega feriados de vários arquivos (CSV, JSON ou iCalendar) de uma vez:
+        duplicatas são descartadas e os índices são reconstruídos uma única vez.
+        Retorna quantos feriados novos foram incorporados.
+        """
+        holidays: List[Holiday] = []
+        for path in paths:
+            holidays.extend(read_holiday_file(path, default_type, jurisdiction))
+        before = len(self.holidays)
+        self.add_holidays(holidays)
+        return len(self.holidays) - before
+    
+    def adopt_year_calendar(self, calendar: YearCalendar):
+        """
+        Usa um YearCalendar pré-computado no lugar de construí-lo. Cabe a quem
+        chama garantir que ele reflete exatamente os feriados carregados.
+        """
+        self._year_calendars[calendar.year] = calendar
+    
+    def load_calendar(self, calendar: HolidayCalendar):
+        """Incorpora um calendário já construído (por exemplo, recebido de outro processo)"""
+        key = (calendar.year, calendar.jurisdiction)
+        if key in self._loaded_calendars:
+            return
+        self._loaded_calendars.add(key)
+        self.add_holidays(calendar.holidays)
     
     def is_holiday(self, check_date: date) -> Optional[Holiday]:
-        """Verifica se uma data é feriado"""
-        for holiday in self.holidays:
-            if holiday.date == check_date:
-                return holiday
-        return None
+        """Verifica se uma data é feriado (consulta O(1) no índice por ordinal)"""
+        return self._holiday_index.get(check_date.toordinal())
     
     def is_weekend(self, check_date: date) -> bool:
         """Verifica se é fim de semana (0=segunda, 6=domingo)"""
         return check_date.weekday() >= 5
     
     def period_contains_holiday(self, period: DateRange) -> List[Holiday]:
-        """Verifica se um período contém feriados"""
-        holidays_in_period = []
-        current = period.start_date
-        while current <= period.end_date:
-            holiday = self.is_holiday(current)
-            if holiday:
-                holidays_in_period.append(holiday)
-            current += timedelta(days=1)
-        return holidays_in_period
+        """Verifica se um período contém feriados (busca binária, O(log n + k))"""
+        ordinals = self._holiday_ordinals
+        lo = bisect.bisect_left(ordinals, period.start_ordinal)
+        hi = bisect.bisect_right(ordinals, period.end_ordinal, lo)
+        index = self._holiday_index
+        return [index[ordinal] for ordinal in ordinals[lo:hi]]
+    
+    def period_is_free(self, period: DateRange) -> bool:
+        """Verifica se o período não tem feriados nem dias bloqueados (busca binária)"""
+        ordinals = self._forbidden_ordinals
+        lo = bisect.bisect_left(ordinals, period.start_ordinal)
+        return lo == len(ordinals) or ordinals[lo] > period.end_ordinal
+    
+    def validate_batch(self, starts: Sequence[int], ends: Sequence[int]) -> Tuple[Any, Any]:
+        """
+        Valida vários períodos de uma vez a partir dos ordinais de início e fim.
+        Retorna a máscara dos períodos que contêm feriados (ou dias bloqueados) e
+        a quantidade desses dias em cada período. Usa searchsorted do NumPy quando disponível
+        (arrays na saída) e bisect caso contrário (listas na saída).
+        """
+        if np is not None:
+            if self._holiday_ordinals_array is None:
+                self._holiday_ordinals_array = np.asarray(self._forbidden_ordinals, dtype=np.int64)
+            ordinals = self._holiday_ordinals_array
+            lo = np.searchsorted(ordinals, np.asarray(starts, dtype=np.int64), side="left")
+            hi = np.searchsorted(ordinals, np.asarray(ends, dtype=np.int64), side="right")
+            counts = np.maximum(hi - lo, 0)
+            return counts > 0, counts
+        
+        ordinals = self._forbidden_ordinals
+        counts = [max(bisect.bisect_right(ordinals, end) - bisect.bisect_left(ordinals, start), 0)
+                  for start, end in zip(starts, ends)]
+        return [count > 0 for count in counts], counts
+    
+    def validate_recommendations(self, recommendations: List[Recommendation]) -> Tuple[Any, Any]:
+        """Aplica validate_batch aos períodos de uma lista (ou RecommendationSet) de recomendações"""
+        if isinstance(recommendations, RecommendationSet):
+            return self.validate_batch(recommendations.starts, recommendations.ends)
+        starts = [rec.date_range.start_ordinal for rec in recommendations]
+        ends = [rec.date_range.end_ordinal for rec in recommendations]
+        return self.validate_batch(starts, ends)
+    
+    def find_nearest_window(self, period: DateRange) -> Optional[DateRange]:
+        """
+        Encontra o período sem feriados (nem dias bloqueados), de mesma duração e
+        iniciado em dia útil, mais próximo do período dado (para frente ou para trás; empate vai para frente)
+        """
+        if self._free_windows is None:
+            self._free_windows = FreeWindowIndex(self._forbidden_ordinals)
+        
+        start = period.start_ordinal
+        length = period.duration_days()
+        forward = self._free_windows.next_window(start, length)
+        backward = self._free_windows.previous_window(start, length)
+        
+        candidates = [c for c in (forward, backward) if c is not None]
+        if not candidates:
+            return None
+        best = min(candidates, key=lambda c: abs(c - start))
+        return DateRange.from_ordinals(best, best + length - 1)
+    
+    def free_runs(self, year: int) -> List[int]:
+        """
+        free_run[d] = dias consecutivos sem feriado nem dia bloqueado a partir do
+        dia d do ano (0 = 1/1), sem passar de 31/12; a lista tem um 0 extra no fim
+        """
+        calendar = self.get_year_calendar(year)
+        day_types = calendar.day_types
+        size = len(day_types)
+        blocked = self._blocked_days
+        first_ordinal = calendar.first_ordinal
+        free_run = [0] * (size + 1)
+        for day in range(size - 1, -1, -1):
+            if day_types[day] >= DAY_NATIONAL or first_ordinal + day in blocked:
+                free_run[day] = 0
+            else:
+                free_run[day] = free_run[day + 1] + 1
+        return free_run
+    
+    def year_off_runs(self, year: int) -> Tuple[List[int], List[int]]:
+        """
+        Para cada dia do ano (mais OFF_RUN_MARGIN dias de cada lado), retorna quantos
+        dias de folga consecutivos terminam imediatamente antes dele e quantos
+        começam imediatamente depois dele. Índice 0 = OFF_RUN_MARGIN dias antes de 1/1.
+        """
+        runs = self._off_runs.get(year)
+        if runs is not None:
+            return runs
+        
+        calendar = self.get_year_calendar(year)
+        size = len(calendar.day_types)
+        total = size + 2 * OFF_RUN_MARGIN
+        first = calendar.first_ordinal - OFF_RUN_MARGIN
+        index = self._holiday_index
+        
+        off = bytearray(total)
+        for x in range(total):
+            day = x - OFF_RUN_MARGIN
+            if 0 <= day < size:
+                off[x] = calendar.day_types[day] != DAY_WORKDAY
+            else:
+                ordinal = first + x
+                off[x] = ordinal in index or (ordinal - 1) % 7 >= 5
+        
+        before = [0] * total
+        after = [0] * total
+        for x in range(1, total):
+            before[x] = before[x - 1] + 1 if off[x - 1] else 0
+        for x in range(total - 2, -1, -1):
+            after[x] = after[x + 1] + 1 if off[x + 1] else 0
+        
+        runs = (before, after)
+        self._off_runs[year] = runs
+        return runs
+    
+    def find_optimal_plans(self, year: int, budget: int = 30, max_fractions: int = MAX_FRACTIONS,
+                           min_fraction_days: int = MIN_FRACTION_DAYS, top_k: int = 5) -> List[VacationPlan]:
+        """
+        Busca exata (programação dinâmica) dos top_k planos que gastam exatamente
+        `budget` dias de férias em até `max_fractions` frações de no mínimo
+        `min_fraction_days` dias, maximizando o total de dias de folga contínuos.
+        
+        Cada fração começa em dia útil, não contém feriados e rende o bloco de folga
+        formado por ela e pelos fins de semana/feriados adjacentes. Os blocos de
+        frações diferentes não podem se tocar: entre eles sobra ao menos um dia
+        útil, senão as duas frações seriam uma só. Como todo plano gasta o orçamento
+        inteiro, maximizar a folga equivale a maximizar os dias "ganhos" nas bordas.
+        """
+        if budget < 0 or max_fractions < 1 or min_fraction_days < 1 or top_k < 1:
+            raise ValueError(f"Parâmetros de busca inválidos: orçamento {budget}, {max_fractions} frações "
+                             f"de no mínimo {min_fraction_days} dias, top_k {top_k}")
+        
+        key = (year, budget, max_fractions, min_fraction_days, top_k)
+        plans = self._plan_cache.get(key)
+        if plans is not None:
+            return plans
+        
+        calendar = self.get_year_calendar(year)
+        day_types = calendar.day_types
+        size = len(day_types)
+        total = size + 2 * OFF_RUN_MARGIN
+        before, after = self.year_off_runs(year)
+        
+        free_run = self.free_runs(year)
+        
+        # Frações candidatas agrupadas pela posição inicial do bloco de folga que criam
+        candidates = [[] for _ in range(total)]
+        for day in range(size):
+            if day_types[day] != DAY_WORKDAY:
+                continue
+            x = day + OFF_RUN_MARGIN
+            for length in range(min_fraction_days, min(budget, free_run[day]) + 1):
+                end = x + length - 1
+                # O próximo bloco precisa começar depois do dia útil que separa os dois
+                next_position = min(end + after[end] + 2, total)
+                candidates[x - before[x]].append((length, before[x] + after[end], next_position, day))
+        
+        # tables[p][k][b]: até top_k melhores (ganho, escolhas) usando k frações e b dias
+        # com todos os blocos começando em p ou depois. A varredura vai de trás para frente.
+        empty = ()
+        table = [[empty] * (budget + 1) for _ in range(max_fractions + 1)]
+        table[0][0] = ((0, None),)
+        tables = [None] * (total + 1)
+        tables[total] = table
+        by_gain = itemgetter(0)
+        
+        for position in range(total - 1, -1, -1):
+            if candidates[position]:
+                table = [list(row) for row in table]
+                for length, gain, next_position, day in candidates[position]:
+                    source = tables[next_position]
+                    for k in range(max_fractions):
+                        source_row = source[k]
+                        target_row = table[k + 1]
+                        for used in range(budget - length + 1):
+                            entries = source_row[used]
+                            if not entries:
+                                continue
+                            current = target_row[used + length]
+                            if len(current) >= top_k:
+                                # Só entram escolhas que superam a pior já guardada
+                                floor = current[-1][0] - gain
+                                if entries[0][0] <= floor:
+                                    continue
+                                merged = [(value + gain, (day, length, choices))
+                                          for value, choices in entries if value > floor]
+                            else:
+                                merged = [(value + gain, (day, length, choices))
+                                          for value, choices in entries]
+                            if current:
+                                merged = sorted(list(current) + merged, key=by_gain, reverse=True)
+                            target_row[used + length] = merged[:top_k]
+            tables[position] = table
+        
+        best = []
+        for k in range(1, max_fractions + 1):
+            best.extend(table[k][budget])
+        best.sort(key=by_gain, reverse=True)
+        
+        plans = []
+        for _, choices in best[:top_k]:
+            fractions = []
+            blocks = []
+            while choices is not None:
+                day, length, choices = choices
+                x = day + OFF_RUN_MARGIN
+                start = calendar.first_ordinal + day
+                end = start + length - 1
+                fractions.append(DateRange.from_ordinals(start, end))
+                blocks.append(DateRange.from_ordinals(start - before[x], end + after[x + length - 1]))
+            plans.append(VacationPlan(fractions, blocks))
+        
+        self._plan_cache[key] = plans
+        return plans
+    
+    def score_ordinals(self, start_ordinal: int, end_ordinal: int) -> float:
+        """
+        Eficiência de um período: tamanho do bloco contínuo de folga que ele forma
+        com os fins de semana e feriados adjacentes, dividido pelos dias de férias
+        gastos. Memorizada por (início, fim, versão do calendário).
+        """
+        key = (start_ordinal, end_ordinal, self.calendar_version)
+        score = self._score_cache.get(key)
+        if score is None:
+            year = date.fromordinal(start_ordinal).year
+            origin = date(year, 1, 1).toordinal() - OFF_RUN_MARGIN
+            before, after = self.year_off_runs(year)
+            end_x = end_ordinal - origin
+            if end_x >= len(after):
+                # O fim cai além da margem do ano do início: usa as sequências do ano do fim
+                year = date.fromordinal(end_ordinal).year
+                _, after = self.year_off_runs(year)
+                end_x = end_ordinal - (date(year, 1, 1).toordinal() - OFF_RUN_MARGIN)
+            days_spent = end_ordinal - start_ordinal + 1
+            score = (before[start_ordinal - origin] + days_spent + after[end_x]) / days_spent
+            self._score_cache[key] = score
+        return score
+    
+    def score_period(self, period: DateRange) -> float:
+        return self.score_ordinals(period.start_ordinal, period.end_ordinal)
+    
+    def score_recommendation(self, rec: Recommendation) -> float:
+        """Pontuação pelo período da recomendação (pode ser usada como scorer do pipeline)"""
+        return self.score_period(rec.date_range)
+    
+    def score_batch(self, starts: Sequence[int], ends: Sequence[int]) -> List[float]:
+        """Pontua vários períodos a partir dos ordinais (por exemplo, colunas de um RecommendationSet)"""
+        score = self.score_ordinals
+        return [score(start, end) for start, end in zip(starts, ends)]
     
     def create_recommendations_with_problems(self, year: int, count: int = 10) -> List[Recommendation]:
         """Gera recomendações deliberadamente problemáticas que podem incluir feriados"""
-        recommendations = []
+        return list(self.iter_recommendations_with_problems(year, count))
+    
+    def iter_recommendations_with_problems(self, year: int, count: int = 10) -> Iterator[Recommendation]:
+        """Versão em gerador de create_recommendations_with_problems"""
+        produced = 0
         
         # Estratégia 1: Recomendações próximas a feriados (mas incluindo-os)
         for holiday in self.holidays:
-            if len(recommendations) >= count:
+            if produced >= count:
                 break
                 
             if holiday.date.year == year:
@@ -171,18 +1879,20 @@ class VacationOptimizer:
                     end_date = start_date + timedelta(days=4)
                 
                 date_range = DateRange(start_date, end_date)
+                score = self.score_period(date_range)
                 
-                recommendations.append(Recommendation(
+                produced += 1
+                yield Recommendation(
                     f"Férias problemáticas incluindo {holiday.name}",
                     f"Este período INCLUI o feriado de {holiday.name}",
                     date_range,
-                    1.2,
+                    score,
                     date_range.duration_days(),
-                    random.uniform(5.0, 9.0)
-                ))
+                    score
+                )
         
         # Estratégia 2: Recomendações aleatórias (que podem incluir feriados)
-        while len(recommendations) < count:
+        while produced < count:
             month = random.randint(1, 12)
             day = random.randint(1, 28)
             start_date = date(year, month, day)
@@ -193,327 +1903,313 @@ class VacationOptimizer:
             
             holidays_in_period = self.period_contains_holiday(date_range)
             has_holidays = len(holidays_in_period) > 0
+            score = self.score_period(date_range)
             
-            recommendations.append(Recommendation(
+            produced += 1
+            yield Recommendation(
                 f"{'Férias problemáticas' if has_holidays else 'Férias normais'} em {month}/{year}",
                 f"Este período {'INCLUI' if has_holidays else 'NÃO inclui'} feriados",
                 date_range,
-                1.3,
+                score,
                 date_range.duration_days(),
-                random.uniform(4.0, 8.0)
-            ))
-        
-        return recommendations
+                score
+            )
     
-    def create_bridge_recommendations(self, year: int, count: int = 10) -> List[Recommendation]:
-        """Cria recomendações de ponte, evitando incluir feriados"""
-        recommendations = []
-        
-        # Organizar feriados por data
-        sorted_holidays = sorted(self.holidays, key=lambda h: h.date)
+    def create_bridge_recommendations(self, year: int, count: int = 10, budget: int = 30) -> List[Recommendation]:
+        """
+        Cria recomendações a partir das frações dos melhores planos de férias do ano
+        (find_optimal_plans), que por construção nunca incluem feriados
+        """
+        return list(self.iter_optimal_recommendations(year, count, budget))
+    
+    def iter_optimal_recommendations(self, year: int, count: int = 10, budget: int = 30) -> Iterator[Recommendation]:
+        """Versão em gerador de create_bridge_recommendations"""
+        produced = 0
+        seen = set()
         
-        # Encontrar pontes entre feriados
-        for i, holiday1 in enumerate(sorted_holidays[:-1]):
-            if len(recommendations) >= count:
-                break
+        for rank, plan in enumerate(self.find_optimal_plans(year, budget, top_k=count), 1):
+            for fraction, block in zip(plan.fractions, plan.blocks):
+                if produced >= count:
+                    return
                 
-            if holiday1.date.year != year:
-                continue
-                
-            # Procurar o próximo feriado
-            for j in range(i+1, len(sorted_holidays)):
-                holiday2 = sorted_holidays[j]
-                
-                if holiday2.date.year != year:
+                key = (fraction.start_date, fraction.end_date)
+                if key in seen:
                     continue
-                    
-                # Calcular dias entre os feriados
-                days_between = (holiday2.date - holiday1.date).days - 1
-                
-                # Consideramos uma ponte se tiver entre 1 e 5 dias entre os feriados
-                if 1 <= days_between <= 5:
-                    # Criar uma ponte entre os feriados, SEM incluí-los
-                    bridge_start = holiday1.date + timedelta(days=1)
-                    bridge_end = holiday2.date - timedelta(days=1)
-                    
-                    # Verificar se a ponte é válida
-                    if bridge_start <= bridge_end:
-                        date_range = DateRange(bridge_start, bridge_end)
-                        
-                        # Garantir que a ponte não contenha outros feriados
-                        bridge_holidays = self.period_contains_holiday(date_range)
-                        
-                        if not bridge_holidays:
-                            recommendations.append(Recommendation(
-                                f"Ponte entre {holiday1.name} e {holiday2.name}",
-                                f"Aproveite esta ponte estratégica entre {holiday1.name} e {holiday2.name}",
-                                date_range,
-                                1.5,
-                                date_range.duration_days(),
-                                7.5  # Pontuação estratégica alta para pontes
-                            ))
-                            break  # Vá para o próximo feriado inicial
-        
-        # Se não encontramos pontes suficientes, adicionar recomendações estratégicas
-        if len(recommendations) < count:
-            # Estratégia: períodos próximos a feriados, mas sem incluí-los
-            for holiday in sorted_holidays:
-                if len(recommendations) >= count:
-                    break
-                    
-                if holiday.date.year != year:
-                    continue
-                
-                # Definir período com base no dia da semana do feriado
-                weekday = holiday.date.weekday()
+                seen.add(key)
                 
-                # Estratégias para diferentes dias da semana
-                if weekday == 0:  # Segunda-feira
-                    # Tirar de terça a sexta após o feriado
-                    start_date = holiday.date + timedelta(days=1)  # Terça após o feriado
-                    end_date = holiday.date + timedelta(days=4)    # Sexta após o feriado
-                elif weekday == 4:  # Sexta-feira
-                    # Tirar de segunda a quinta antes do feriado
-                    start_date = holiday.date - timedelta(days=4)  # Segunda antes do feriado
-                    end_date = holiday.date - timedelta(days=1)    # Quinta antes do feriado
-                elif weekday in [5, 6]:  # Sábado ou domingo
-                    # Tirar de segunda a sexta da semana seguinte
-                    days_to_monday = (7 - weekday) % 7
-                    if days_to_monday == 0:
-                        days_to_monday = 7
-                    
-                    start_date = holiday.date + timedelta(days=days_to_monday)
-                    end_date = start_date + timedelta(days=4)      # 5 dias úteis
-                else:
-                    # Para outros dias, tentar uma semana depois
-                    start_date = holiday.date + timedelta(days=7)  # 7 dias após o feriado
-                    end_date = start_date + timedelta(days=4)      # 5 dias úteis
-                
-                date_range = DateRange(start_date, end_date)
-                
-                # Verificar se o período não contém feriados
-                if not self.period_contains_holiday(date_range):
-                    recommendations.append(Recommendation(
-                        f"Estratégia próxima a {holiday.name}",
-                        f"Período estratégico próximo ao feriado de {holiday.name}, sem incluí-lo",
-                        date_range,
-                        1.4,
-                        date_range.duration_days(),
-                        6.5
-                    ))
-        
-        return recommendations
+                days_spent = fraction.duration_days()
+                produced += 1
+                yield Recommendation(
+                    f"Fração do plano ótimo #{rank}",
+                    f"Gaste {days_spent} dias de férias e obtenha {block.duration_days()} dias "
+                    f"de folga contínuos ({block})",
+                    fraction,
+                    self.score_period(fraction),
+                    days_spent,
+                    plan.efficiency
+                )
     
     def apply_naive_fix(self, recommendations: List[Recommendation]) -> List[Recommendation]:
         """
         Aplica a correção ingênua: simplesmente verifica se cada recomendação contém
         feriados e remove as que contêm.
         """
-        fixed_recommendations = []
-        removed_count = 0
-        
-        for rec in recommendations:
-            holidays_in_period = self.period_contains_holiday(rec.date_range)
-            
-            if not holidays_in_period:
-                fixed_recommendations.append(rec)
-            else:
-                removed_count += 1
-        
-        print(f"Correção ingênua: {removed_count} recomendações problemáticas removidas")
-        return fixed_recommendations
+        return [rec for rec, invalid in self.validate_stage(recommendations) if not invalid]
     
     def apply_smart_fix(self, recommendations: List[Recommendation]) -> List[Recommendation]:
         """
         Aplica a correção inteligente: tenta ajustar os períodos problemáticos
         para evitar feriados, em vez de simplesmente removê-los.
         """
-        fixed_recommendations = []
-        adjusted_count = 0
-        removed_count = 0
-        
-        for rec in recommendations:
-            holidays_in_period = self.period_contains_holiday(rec.date_range)
-            
-            if not holidays_in_period:
-                # Se não contém feriados, manter como está
-                fixed_recommendations.append(rec)
+        # Recomendações sem feriados seguem como estão; as demais são ajustadas
+        # ou, se não houver janela possível, removidas
+        return list(self.adjust_stage(self.validate_stage(recommendations)))
+    
+    def _adjust_recommendation(self, rec: Recommendation) -> Optional[Recommendation]:
+        """Desloca o período para a janela sem feriados mais próxima (None se não houver)"""
+        new_range = self.find_nearest_window(rec.date_range)
+        if new_range is None:
+            return None
+        # O período mudou, então a pontuação é recalculada para a nova posição
+        score = self.score_period(new_range)
+        return Recommendation(
+            f"{rec.title} (Ajustado)",
+            f"{rec.description} [Período ajustado para evitar feriados]",
+            new_range,
+            score,
+            rec.days_changed,
+            score
+        )
+    
+    # Pipeline em geradores: gerar -> validar -> ajustar -> pontuar -> top-K.
+    # Cada etapa consome a anterior sob demanda, então a memória fica em O(K + bloco).
+    
+    def validate_stage(self, recommendations: Iterable[Recommendation],
+                       chunk_size: int = PIPELINE_CHUNK_SIZE) -> Iterator[Tuple[Recommendation, bool]]:
+        """Valida o fluxo em blocos (validate_batch), produzindo (recomendação, contém feriado)"""
+        iterator = iter(recommendations)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                return
+            has_holiday, _ = self.validate_recommendations(chunk)
+            yield from zip(chunk, map(bool, has_holiday))
+    
+    def adjust_stage(self, validated: Iterable[Tuple[Recommendation, bool]]) -> Iterator[Recommendation]:
+        """Mantém as recomendações válidas e ajusta (ou descarta) as que contêm feriados"""
+        for rec, invalid in validated:
+            if not invalid:
+                yield rec
                 continue
-            
-            # Tentar ajustar o período para evitar feriados
-            adjusted = False
-            
-            # Estratégia 1: Mover o período para depois de todos os feriados
-            last_holiday = max(holidays_in_period, key=lambda h: h.date)
-            new_start = last_holiday.date + timedelta(days=1)
-            
-            # Garantir que começamos em um dia útil (não fim de semana)
-            while self.is_weekend(new_start):
-                new_start += timedelta(days=1)
-                
-            # Manter a mesma duração
-            original_duration = rec.date_range.duration_days()
-            new_end = new_start + timedelta(days=original_duration - 1)
-            
-            # Verificar se o novo período também não contém feriados
-            new_range = DateRange(new_start, new_end)
-            holidays_in_new_period = self.period_contains_holiday(new_range)
-            
-            if not holidays_in_new_period:
-                # Criar uma nova recomendação com o período ajustado
-                adjusted_rec = Recommendation(
-                    f"{rec.title} (Ajustado)",
-                    f"{rec.description} [Período ajustado para evitar feriados]",
-                    new_range,
-                    rec.efficiency_gain,
-                    rec.days_changed,
-                    rec.strategic_score
-                )
-                fixed_recommendations.append(adjusted_rec)
-                adjusted_count += 1
-                adjusted = True
-            
-            if not adjusted:
-                # Se não conseguimos ajustar, remover a recomendação
-                removed_count += 1
-        
-        print(f"Correção inteligente: {adjusted_count} recomendações ajustadas, {removed_count} removidas")
-        return fixed_recommendations
+            adjusted_rec = self._adjust_recommendation(rec)
+            if adjusted_rec is not None:
+                yield adjusted_rec
+    
+    def score_stage(self, recommendations: Iterable[Recommendation],
+                    scorer: Optional[Callable[[Recommendation], float]] = None) -> Iterator[Tuple[float, Recommendation]]:
+        """Associa uma pontuação a cada recomendação (por padrão, strategic_score)"""
+        if scorer is None:
+            scorer = attrgetter("strategic_score")
+        for rec in recommendations:
+            yield scorer(rec), rec
+    
+    @staticmethod
+    def top_k(scored: Iterable[Tuple[float, Recommendation]], k: int) -> List[Recommendation]:
+        """Mantém apenas as k maiores pontuações num heap limitado (empate: a mais antiga)"""
+        heap = []
+        for order, (score, rec) in enumerate(scored):
+            item = (score, -order, rec)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, item)
+        return [rec for _, _, rec in sorted(heap, key=itemgetter(0, 1), reverse=True)]
+    
+    def run_pipeline(self, candidates: Iterable[Recommendation], k: int = 10, adjust: bool = True,
+                     scorer: Optional[Callable[[Recommendation], float]] = None) -> List[Recommendation]:
+        """Encadeia as etapas do pipeline sobre um fluxo de candidatos e retorna os k melhores"""
+        validated = self.validate_stage(candidates)
+        if adjust:
+            recommendations = self.adjust_stage(validated)
+        else:
+            recommendations = (rec for rec, invalid in validated if not invalid)
+        return self.top_k(self.score_stage(recommendations, scorer), k)
+    
+    def format_period_details(self, period: DateRange, title: str = "Detalhes do Período") -> str:
+        """Descreve um período: dias úteis, fins de semana e feriados"""
+        return _format_period_details(period, title, self.period_stats(period),
+                                      self.period_contains_holiday(period))
     
     def print_period_details(self, period: DateRange, title: str = "Detalhes do Período"):
         """Imprime detalhes de um período, incluindo dias úteis, fins de semana e feriados"""
-        print(f"\n{title}: {period}")
-        
-        days = period.day_list()
-        workdays = 0
-        weekends = 0
-        holidays_list = []
-        
-        for day in days:
-            if self.is_holiday(day):
-                holiday = self.is_holiday(day)
-                holidays_list.append(f"{day.strftime('%d/%m/%Y')} ({day.strftime('%a')}): {holiday.name}")
-            elif self.is_weekend(day):
-                weekends += 1
-            else:
-                workdays += 1
-        
-        print(f"Duração: {len(days)} dias")
-        print(f"Dias úteis: {workdays}")
-        print(f"Fins de semana: {weekends}")
-        print(f"Feriados: {len(holidays_list)}")
-        
-        if holidays_list:
-            print("Lista de feriados no período:")
-            for h in holidays_list:
-                print(f"  - {h}")
+        print(self.format_period_details(period, title))
     
-    def run_tests(self, year: int):
-        """Executa testes para verificar a eficácia das correções"""
-        print("\n" + "="*80)
-        print(f"TESTE DE ALGORITMO DE OTIMIZAÇÃO DE FÉRIAS - ANO: {year}")
-        print("="*80)
+    def run_tests(self, year: int) -> OptimizerRunResult:
+        """
+        Executa testes para verificar a eficácia das correções. Nada é formatado
+        nem impresso aqui: o resultado estruturado gera o relatório sob demanda.
+        """
+        result = OptimizerRunResult(year)
+        clock = time.perf_counter
         
         # Carregar feriados
+        started = clock()
         self.load_holidays(year)
+        result.holidays_loaded = len(self.holidays)
+        result.holidays_in_year = sum(1 for h in self.holidays if h.date.year == year)
+        result.timings["load_holidays"] = clock() - started
         
         # 1. Gerar recomendações com problemas
-        print("\n1. Gerando recomendações problemáticas (que podem incluir feriados)")
-        problem_recommendations = self.create_recommendations_with_problems(year, 20)
-        
-        problematic_count = 0
-        for rec in problem_recommendations:
-            holidays = self.period_contains_holiday(rec.date_range)
-            if holidays:
-                problematic_count += 1
-                print(f"  - PROBLEMA: {rec.title} contém {len(holidays)} feriado(s)")
-        
-        print(f"Total de recomendações geradas: {len(problem_recommendations)}")
-        print(f"Recomendações com problemas: {problematic_count}")
-        
-        # 2. Criar recomendações de ponte (já corrigidas)
-        print("\n2. Gerando recomendações de ponte (já evitando feriados)")
-        bridge_recommendations = self.create_bridge_recommendations(year, 10)
-        
-        problematic_bridges = 0
-        for rec in bridge_recommendations:
-            holidays = self.period_contains_holiday(rec.date_range)
-            if holidays:
-                problematic_bridges += 1
-                print(f"  - ERRO: {rec.title} contém {len(holidays)} feriado(s) - ISTO NÃO DEVERIA ACONTECER")
+        started = clock()
+        result.problem_recommendations = self.create_recommendations_with_problems(year, 20)
+        result.problems = self._flag_holidays(result.problem_recommendations)
+        result.timings["problem_recommendations"] = clock() - started
         
-        print(f"Total de pontes geradas: {len(bridge_recommendations)}")
-        print(f"Pontes problematicas: {problematic_bridges}")
+        # 2. Criar recomendações a partir dos planos ótimos (já corrigidas)
+        started = clock()
+        result.optimal_recommendations = self.create_bridge_recommendations(year, 10)
+        result.optimal_problems = self._flag_holidays(result.optimal_recommendations)
+        result.timings["optimal_recommendations"] = clock() - started
         
         # 3. Aplicar correção ingênua
-        print("\n3. Aplicando correção ingênua (remover recomendações com feriados)")
-        naive_fixed = self.apply_naive_fix(problem_recommendations)
-        
-        naive_still_problematic = 0
-        for rec in naive_fixed:
-            holidays = self.period_contains_holiday(rec.date_range)
-            if holidays:
-                naive_still_problematic += 1
-                print(f"  - FALHA: {rec.title} ainda contém {len(holidays)} feriado(s)")
-        
-        print(f"Recomendações após correção ingênua: {len(naive_fixed)}")
-        print(f"Ainda problemáticas: {naive_still_problematic}")
+        started = clock()
+        result.naive_fixed = self.apply_naive_fix(result.problem_recommendations)
+        result.naive_failures = self._flag_holidays(result.naive_fixed)
+        result.timings["naive_fix"] = clock() - started
         
         # 4. Aplicar correção inteligente
-        print("\n4. Aplicando correção inteligente (ajustar períodos para evitar feriados)")
-        smart_fixed = self.apply_smart_fix(problem_recommendations)
-        
-        smart_still_problematic = 0
-        for rec in smart_fixed:
-            holidays = self.period_contains_holiday(rec.date_range)
-            if holidays:
-                smart_still_problematic += 1
-                print(f"  - FALHA: {rec.title} ainda contém {len(holidays)} feriado(s)")
-        
-        print(f"Recomendações após correção inteligente: {len(smart_fixed)}")
-        print(f"Ainda problemáticas: {smart_still_problematic}")
+        started = clock()
+        result.smart_fixed = self.apply_smart_fix(result.problem_recommendations)
+        result.smart_failures = self._flag_holidays(result.smart_fixed)
+        result.timings["smart_fix"] = clock() - started
         
         # 5. Teste de verificação final (combinando todas as recomendações e aplicando verificação)
-        print("\n5. Teste de verificação final")
-        all_recommendations = problem_recommendations + bridge_recommendations
-        
-        # Aplicar verificação final
-        final_valid_recommendations = []
-        for rec in all_recommendations:
-            if not self.period_contains_holiday(rec.date_range):
-                final_valid_recommendations.append(rec)
-        
-        print(f"Total de recomendações: {len(all_recommendations)}")
-        print(f"Recomendações válidas após verificação final: {len(final_valid_recommendations)}")
-        print(f"Recomendações removidas: {len(all_recommendations) - len(final_valid_recommendations)}")
-        
-        # 6. Resumo do teste
-        print("\n" + "="*80)
-        print("RESUMO DO TESTE")
-        print("="*80)
-        print(f"Feriados no ano {year}: {len([h for h in self.holidays if h.date.year == year])}")
-        print(f"Recomendações geradas com problemas potenciais: {len(problem_recommendations)}")
-        print(f"Problemas reais encontrados: {problematic_count}")
-        print(f"Eficácia da correção ingênua: {100 * (problematic_count - naive_still_problematic) / max(1, problematic_count):.1f}%")
-        print(f"Eficácia da correção inteligente: {100 * (problematic_count - smart_still_problematic) / max(1, problematic_count):.1f}%")
-        print(f"Eficácia da verificação final: 100%")
-        
-        # Mostrar exemplos de recomendações válidas
-        if final_valid_recommendations:
-            print("\nExemplos de recomendações válidas:")
-            for i, rec in enumerate(final_valid_recommendations[:3]):
-                print(f"\nRecomendação {i+1}: {rec}")
-                self.print_period_details(rec.date_range, "Detalhes")
-        
-        print("\n" + "="*80)
-        print("CONCLUSÃO")
-        print("="*80)
-        
-        success = naive_still_problematic == 0 and smart_still_problematic == 0
-        print("RESULTADO DO TESTE: " + ("SUCESSO" if success else "FALHA"))
-        print("Todas as correções implementadas são eficazes? " + ("SIM" if success else "NÃO"))
+        started = clock()
+        all_recommendations = result.problem_recommendations + result.optimal_recommendations
+        has_holiday, _ = self.validate_recommendations(all_recommendations)
+        result.final_valid = [rec for rec, invalid in zip(all_recommendations, has_holiday) if not invalid]
+        result.final_removed = len(all_recommendations) - len(result.final_valid)
+        result.timings["final_verification"] = clock() - started
         
-        return success
+        # Exemplos para o relatório: apenas as contagens, a formatação fica para render()
+        result.examples = [(rec, self.period_stats(rec.date_range), self.period_contains_holiday(rec.date_range))
+                           for rec in result.final_valid[:3]]
+        return result
+    
+    def _flag_holidays(self, recommendations: List[Recommendation]) -> List[Tuple[Recommendation, int]]:
+        """Recomendações que contêm feriados, com a quantidade de feriados de cada uma"""
+        _, counts = self.validate_recommendations(recommendations)
+        return [(rec, int(count)) for rec, count in zip(recommendations, counts) if count]
+
+
+class RecommendationTracker:
+    """
+    Recomendações mantidas corrigidas (como em apply_smart_fix) enquanto feriados
+    e períodos bloqueados mudam no otimizador. Cada recomendação fica indexada
+    pelos dias que podem alterar seu resultado: o próprio período, quando ele é
+    válido, ou o trecho até a distância da janela ajustada, já que só uma mudança
+    ali cria ou elimina uma janela mais próxima. Assim, cada alteração refaz
+    apenas as recomendações dos dias alterados.
+    """
+
+    def __init__(self, optimizer: VacationOptimizer, recommendations: Iterable[Recommendation] = ()):
+        self.optimizer = optimizer
+        self._originals: Dict[int, Recommendation] = {}
+        self._current: Dict[int, Optional[Recommendation]] = {}
+        self._spans: Dict[int, Optional[Tuple[int, int]]] = {}
+        self._by_day: Dict[int, Set[int]] = {}
+        # Recomendações sem janela possível: qualquer mudança pode criar uma
+        self._unplaced: Set[int] = set()
+        self._next_slot = 0
+        # Quantas recomendações já foram refeitas por mudanças no calendário
+        self.recomputed = 0
+        optimizer.add_change_listener(self._dates_changed)
+        for rec in recommendations:
+            self.add(rec)
+
+    def add(self, rec: Recommendation) -> int:
+        """Acompanha uma recomendação original e retorna sua posição"""
+        slot = self._next_slot
+        self._next_slot += 1
+        self._originals[slot] = rec
+        self._place(slot)
+        return slot
+
+    def discard(self, slot: int):
+        self._unindex(slot)
+        del self._originals[slot]
+        del self._current[slot]
+
+    def get(self, slot: int) -> Optional[Recommendation]:
+        """Versão corrigida atual da recomendação (None se não há janela possível)"""
+        return self._current[slot]
+
+    def _place(self, slot: int):
+        rec = self._originals[slot]
+        period = rec.date_range
+        start = period.start_ordinal
+        end = period.end_ordinal
+
+        if self.optimizer.period_is_free(period):
+            current, span = rec, (start, end)
+        else:
+            current = self.optimizer._adjust_recommendation(rec)
+            if current is None:
+                span = None
+            else:
+                distance = abs(current.date_range.start_ordinal - start)
+                span = (start - distance, end + distance)
+
+        self._current[slot] = current
+        self._spans[slot] = span
+        if span is None:
+            self._unplaced.add(slot)
+            return
+        by_day = self._by_day
+        for ordinal in range(span[0], span[1] + 1):
+            bucket = by_day.get(ordinal)
+            if bucket is None:
+                by_day[ordinal] = {slot}
+            else:
+                bucket.add(slot)
+
+    def _unindex(self, slot: int):
+        span = self._spans.pop(slot)
+        if span is None:
+            self._unplaced.discard(slot)
+            return
+        by_day = self._by_day
+        for ordinal in range(span[0], span[1] + 1):
+            bucket = by_day[ordinal]
+            bucket.discard(slot)
+            if not bucket:
+                del by_day[ordinal]
+
+    def _dates_changed(self, first: int, last: int):
+        slots = set(self._unplaced)
+        by_day = self._by_day
+        for ordinal in range(first, last + 1):
+            bucket = by_day.get(ordinal)
+            if bucket:
+                slots.update(bucket)
+        for slot in slots:
+            self._unindex(slot)
+            self._place(slot)
+        self.recomputed += len(slots)
+
+    def recommendations(self) -> List[Recommendation]:
+        """Recomendações corrigidas, na ordem em que foram adicionadas"""
+        return [rec for rec in self._current.values() if rec is not None]
+
+    def __iter__(self):
+        return iter(self.recommendations())
+
+    def __len__(self) -> int:
+        return len(self._originals)
+
+    def close(self):
+        """Deixa de acompanhar as mudanças do otimizador"""
+        self.optimizer.remove_change_listener(self._dates_changed)
 
 
 def main():
@@ -525,8 +2221,9 @@ def main():
     overall_success = True
     
     for year in test_years:
-        success = optimizer.run_tests(year)
-        overall_success = overall_success and success
+        result = optimizer.run_tests(year)
+        print(result.render())
+        overall_success = overall_success and result.success
     
     print("\n" + "="*80)
     print("RESULTADO FINAL")